@@ -1,9 +1,8 @@
 # app.py
 import streamlit as st
-from profile_generator import ProfileGenerator
-import pandas as pd
+from profile_generator import PARAMETERS, ProfileGenerator
+from export import add_download_buttons, profile_key
 import matplotlib.pyplot as plt
-import io
 import os
 
 # Set Streamlit page configuration
@@ -96,7 +95,10 @@ Contributions are welcome! Fork the repository, create a branch, make changes, a
 def profile_generation_page():
     st.title("Profile Generation")
 
-    profile_generator = ProfileGenerator()
+    # One generator per session, so its compiled ranges and custom overrides survive reruns
+    if "profile_generator" not in st.session_state:
+        st.session_state.profile_generator = ProfileGenerator()
+    profile_generator = st.session_state.profile_generator
 
     # --- Sidebar for Input ---
     st.sidebar.header("Input Parameters")
@@ -119,72 +121,25 @@ def profile_generation_page():
     # --- Generate Profile Button ---
     if st.sidebar.button("Generate Profile"):
         with st.spinner("Generating profile..."):
-            data = profile_generator.generate_profile(depth_choice[1], base_type, env_type) # Use the numeric value.  VERY IMPORTANT!
-            if data:
-                st.session_state.data = data  # Store data in session state
-                df = pd.DataFrame(data)
-                st.dataframe(df.style.format("{:.2f}"))  # Format to 2 decimal places
+            # Use the numeric value.  VERY IMPORTANT!
+            df = profile_generator.generate_profile(depth_choice[1], base_type, env_type, engine="numpy", output="frame")
+            if not df.empty:
+                st.session_state.data = df  # Store the frame in session state
+                st.session_state.data_key = profile_key(df)  # Hashed once per profile, keys the export cache
+                st.dataframe(df.style.format("{:.2f}", subset=PARAMETERS))  # Format to 2 decimal places
 
 
                 # --- Display Diagram ---
-                fig = profile_generator.generate_diagram(data)
-                st.pyplot(fig)
+                st.image(profile_generator.preview_diagram(df))  # Fast low-DPI preview
+                st.caption(f"Diagram rendered in {profile_generator.preview_renderer.render_time * 1000:.0f} ms")
             else:
                 st.warning("No data generated. Please check your input parameters.")
 
 
     # --- Save Data ---
-    if 'data' in st.session_state and st.session_state.data:
-        st.sidebar.header("Save Data")
-        df_download = pd.DataFrame(st.session_state.data)
-
-        # CSV download
-        csv = df_download.to_csv(index=False).encode('utf-8')
-        st.sidebar.download_button(
-            label="Download data as CSV",
-            data=csv,
-            file_name='paleo_profile.csv',
-            mime='text/csv',
-        )
-
-        # Excel (xlsx) download.  Requires openpyxl.
-        excel_buffer = io.BytesIO()  # Use BytesIO
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            df_download.to_excel(writer, index=False, sheet_name='Profile Data')
-        excel_buffer.seek(0)  # Rewind the buffer to the beginning
-        st.sidebar.download_button(
-            label="Download data as Excel",
-            data=excel_buffer,
-            file_name='paleo_profile.xlsx',
-            mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        )
-        # Save Diagram
-        if 'data' in st.session_state and st.session_state.data:
-                st.sidebar.header("Save Diagram")
-                # Generate the diagram
-                fig = profile_generator.generate_diagram(st.session_state.data)
-
-                # Save diagram as PNG
-                buf_png = io.BytesIO()
-                fig.savefig(buf_png, format="png")
-                buf_png.seek(0)
-                st.sidebar.download_button(
-                    label="Download Diagram as PNG",
-                    data=buf_png,
-                    file_name="paleo_profile_diagram.png",
-                    mime="image/png",
-                )
-
-                # Save diagram as SVG
-                buf_svg = io.BytesIO()
-                fig.savefig(buf_svg, format="svg")
-                buf_svg.seek(0)
-                st.sidebar.download_button(
-                    label="Download Diagram as SVG",
-                    data=buf_svg,
-                    file_name="paleo_profile_diagram.svg",
-                    mime="image/svg+xml",
-                )
+    if st.session_state.get('data') is not None:
+        # Exports are built on the first click and cached per profile
+        add_download_buttons(st.sidebar, st.session_state.data, st.session_state.data_key)
             
     # --- Advanced Parameter Adjustment (Sliders) ---
     st.sidebar.header("Advanced Parameter Adjustment")
@@ -194,22 +149,26 @@ def profile_generation_page():
         selected_env_type = st.sidebar.selectbox("Select Env. Type (for Zones 1-4):", options=["Lake", "Peatland", "Wetland"], key = "env_type_select") #Added key
         ranges = profile_generator.get_parameter_ranges(selected_base_type, selected_env_type, selected_zone)
 
-        updated_ranges = {}
-        for param, (min_val, max_val, trend) in ranges.items():
-            if param in ["OM", "IM", "CC", "Clay", "Silt", "Sand"]:
-                new_min, new_max = st.sidebar.slider(
-                    f"{param} Range (Zone {selected_zone}, Trend: {trend})",
-                    0, 100, (int(min_val), int(max_val)), step=1
-                )
-            else:
-                new_min, new_max = st.sidebar.slider(
-                    f"{param} Range (Zone {selected_zone}, Trend: {trend})",
-                    0, 9999, (int(min_val), int(max_val)), step=1
-                )
-            updated_ranges[param] = (new_min, new_max, trend) #Keep trend
-
-        if st.sidebar.button("Apply Custom Ranges"):
-            profile_generator.custom_ranges[(selected_zone, selected_base_type, selected_env_type)] = updated_ranges # Pass base/env
+        # Slider edits are staged in a form and submitted together (one rerun)
+        with st.sidebar.form("custom_ranges"):
+            updated_ranges = {}
+            for param, (min_val, max_val, trend) in ranges.items():
+                if param in ["OM", "IM", "CC", "Clay", "Silt", "Sand"]:
+                    new_min, new_max = st.slider(
+                        f"{param} Range (Zone {selected_zone}, Trend: {trend})",
+                        0, 100, (int(min_val), int(max_val)), step=1
+                    )
+                else:
+                    new_min, new_max = st.slider(
+                        f"{param} Range (Zone {selected_zone}, Trend: {trend})",
+                        0, 9999, (int(min_val), int(max_val)), step=1
+                    )
+                updated_ranges[param] = (new_min, new_max, trend) #Keep trend
+
+            apply = st.form_submit_button("Apply Custom Ranges")
+
+        if apply:
+            profile_generator.apply_custom_ranges(selected_zone, selected_base_type, selected_env_type, updated_ranges) # Pass base/env
             st.sidebar.success("Custom ranges applied!")
 
 def main():
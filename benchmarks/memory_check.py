@@ -0,0 +1,79 @@
+# benchmarks/memory_check.py
+# Checks that the process memory (RSS) stays flat over many consecutive generations. Needs psutil.
+# Run from the repository root:
+#   python benchmarks/memory_check.py            # Drives the Tk app (needs a display)
+#   python benchmarks/memory_check.py --headless # Same generation and diagram path, without a window
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psutil
+
+WARMUP = 20  # Generations before the first reading, so caches and the figure are fully built
+TOLERANCE_MB = 20  # Allowed growth from the first reading to the last
+
+
+def tk_generations():
+    """Yields after each profile generated and displayed by the Tk app, through its worker thread."""
+    import tkinter as tk
+    from PPR import PaleoProfileRandomizer
+
+    root = tk.Tk()
+    app = PaleoProfileRandomizer(root)
+    app.depth_var.set(6)
+    app.base_type_var.set("Rock")
+    app.env_type_var.set("Lake")
+    try:
+        while True:
+            app.generate_profile()
+            while app.active_request is not None:
+                root.update()
+                time.sleep(0.001)
+            yield
+    finally:
+        root.destroy()
+
+
+def headless_generations():
+    """Yields after each profile generated and drawn into one reused figure, as the Tk worker does."""
+    from diagram import FastDiagramRenderer
+    from profile_generator import ProfileGenerator
+
+    generator = ProfileGenerator()
+    renderer = FastDiagramRenderer(figsize=(10, 10))
+    while True:
+        frame, stats = generator.generate_profile(6, "Rock", "Lake", engine="numpy", output="frame", stats=True)
+        with stats.timer("diagram"):
+            renderer.render(frame)
+            renderer.figure.canvas.draw()
+        yield
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PPR memory check over consecutive generations.")
+    parser.add_argument("--count", type=int, default=500, help="Generations after the warm-up (default 500).")
+    parser.add_argument("--headless", action="store_true", help="Skip the Tk window.")
+    args = parser.parse_args(argv)
+
+    process = psutil.Process()
+    generations = headless_generations() if args.headless else tk_generations()
+    for _ in range(WARMUP):
+        next(generations)
+    first = process.memory_info().rss / 2**20
+    print(f"{0:6d} generations {first:9.1f} MB")
+    for i in range(1, args.count + 1):
+        next(generations)
+        if i % 50 == 0 or i == args.count:
+            print(f"{i:6d} generations {process.memory_info().rss / 2**20:9.1f} MB")
+    generations.close()
+
+    growth = process.memory_info().rss / 2**20 - first
+    print(f"Growth: {growth:.1f} MB ({'OK' if growth <= TOLERANCE_MB else 'FAILED'}, tolerance {TOLERANCE_MB} MB)")
+    return 0 if growth <= TOLERANCE_MB else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# benchmarks/suite.py
+# Microbenchmarks of profile generation, compositions, rendering and export, with saved baselines.
+# Run from the repository root:
+#   python benchmarks/suite.py                                      # Print the timings
+#   python benchmarks/suite.py --save benchmarks/baselines/new.json  # Save them as a baseline
+#   python benchmarks/suite.py --compare benchmarks/baselines/baseline.json
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from parameter_ranges import BASE_TYPES, ENV_TYPES, ZONES
+from profile_generator import ProfileGenerator, TrendState
+
+DEPTH_CHOICES = [1, 2, 3, 4, 5, 6]
+THRESHOLD = 0.10  # Changes within 10% of the baseline are reported as unchanged
+
+
+def profile(generator, depth_choice=3, seed=0):
+    """Draws a fixed depth and zones for a depth choice, so every run times the same profile."""
+    return generator.draw_depth_and_zones(depth_choice, np.random.default_rng(seed))
+
+
+def generation_benchmarks(generator):
+    """Returns {name: function} for the generation stages."""
+    benchmarks = {}
+    rng = np.random.default_rng(0)
+    benchmarks["zone_percentages"] = lambda: generator.generate_unique_zone_percentages(rng)
+
+    depth, zones = profile(generator)
+    ranges = generator.get_parameter_ranges("Rock", "Lake", 3)
+    bounds = [value for param in ("OM", "CC", "IM") for value in ranges[param]]
+
+    def sum_to_100():
+        state = TrendState()
+        for d in range(0, depth + 1, 2):
+            generator.generate_sum_to_100(*bounds, d, depth, ("OM", "CC", "IM"), 3, zones, state)
+    benchmarks["sum_to_100/profile"] = sum_to_100
+
+    def parameter_ranges():
+        for zone_num in ZONES:
+            for base_type in BASE_TYPES:
+                for env_type in ENV_TYPES:
+                    generator.get_parameter_ranges(base_type, env_type, zone_num)
+    benchmarks["get_parameter_ranges/all"] = parameter_ranges
+
+    for engine in ("python", "numpy"):
+        for depth_choice in DEPTH_CHOICES:
+            depth, zones = profile(generator, depth_choice)
+            benchmarks[f"generate_data/{engine}/choice-{depth_choice}"] = (
+                lambda depth=depth, zones=zones, engine=engine: generator.generate_data(
+                    depth, zones, "Rock", "Lake", engine, np.random.default_rng(0)))
+
+    depth, zones = profile(generator)
+    for base_type in BASE_TYPES:
+        for env_type in ENV_TYPES:
+            benchmarks[f"generate_data/python/{base_type}-{env_type}"] = (
+                lambda base_type=base_type, env_type=env_type: generator.generate_data(
+                    depth, zones, base_type, env_type, "python", np.random.default_rng(0)))
+    return benchmarks
+
+
+def output_benchmarks(generator):
+    """Returns {name: function} for the diagram and the exports of one depth choice 3 profile."""
+    depth, zones = profile(generator)
+    df = pd.DataFrame(generator.generate_data(depth, zones, "Rock", "Lake", "numpy", np.random.default_rng(0)))
+    figure = generator.generate_diagram(df)
+
+    def excel():
+        with pd.ExcelWriter(io.BytesIO(), engine="openpyxl") as writer:
+            df.to_excel(writer, index=False, sheet_name="Profile Data")
+
+    return {
+        "generate_diagram": lambda: generator.generate_diagram(df),
+        "generate_diagram+draw": lambda: generator.generate_diagram(df).canvas.draw(),
+        "preview_diagram": lambda: generator.preview_diagram(df),
+        "export/csv": lambda: df.to_csv(index=False).encode("utf-8"),
+        "export/xlsx": excel,
+        "export/png": lambda: figure.savefig(io.BytesIO(), format="png"),
+        "export/svg": lambda: figure.savefig(io.BytesIO(), format="svg"),
+    }
+
+
+def measure(function, min_time=0.2, repeats=5):
+    """Median and best seconds per call, over repeats rounds of enough calls to last min_time."""
+    function()  # Warm-up
+    calls, elapsed = 1, 0
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeats:
+            break
+        calls *= 2
+    times = [elapsed / calls]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        times.append((time.perf_counter() - start) / calls)
+    return {"median": statistics.median(times), "best": min(times), "calls": calls}
+
+
+def run(pattern="", min_time=0.2):
+    generator = ProfileGenerator()
+    benchmarks = {**generation_benchmarks(generator), **output_benchmarks(generator)}
+    results = {}
+    for name, function in benchmarks.items():
+        if pattern in name:
+            results[name] = measure(function, min_time)
+            print(f"{name:45s} {results[name]['median'] * 1000:10.3f} ms")
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+    }
+
+
+def compare(baseline, results):
+    """Prints current medians against the baseline, with the ratio and a verdict per benchmark."""
+    print(f"{'benchmark':45s} {'baseline ms':>12s} {'current ms':>12s} {'ratio':>7s}")
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:45s} {'-':>12s} {result['median'] * 1000:12.3f} {'-':>7s}  new")
+            continue
+        ratio = result["median"] / old["median"]
+        verdict = "slower" if ratio > 1 + THRESHOLD else "faster" if ratio < 1 - THRESHOLD else ""
+        print(f"{name:45s} {old['median'] * 1000:12.3f} {result['median'] * 1000:12.3f} {ratio:7.2f}  {verdict}")
+    if baseline["environment"] != environment():
+        print("Note: the baseline was recorded in a different environment:", baseline["environment"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PPR benchmark suite.")
+    parser.add_argument("--save", help="Save the results as a baseline JSON file.")
+    parser.add_argument("--compare", help="Compare the results with a baseline JSON file.")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text.")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds spent per benchmark (default 0.2).")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.min_time)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as file:
+            json.dump({"environment": environment(), "results": results}, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            print()
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/zone_sampler.py
+# Compares the old rejection loop of generate_unique_zone_percentages with the exact sampler.
+# Run from the repository root: python benchmarks/zone_sampler.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from samplers import sample_zone_percentages
+
+
+def rejection_zone_percentages():
+    """The previous rejection loop, returning the percentages and the number of draws it needed."""
+    iterations = 0
+    while True:
+        iterations += 1
+        z1 = random.uniform(10, 20)
+        z2 = random.uniform(25, 60)
+        z3 = random.uniform(30, 60)
+        z4 = random.uniform(20, 40)
+        z5 = random.uniform(5, 10)
+        total = round(z1 + z2 + z3 + z4 + z5, 2)
+        if 100 - 0.02 <= total <= 100 + 0.02:
+            nums = [z1, z2, z3, z4, z5]
+            if len(set(nums)) == 5:
+                return nums, iterations
+
+
+def main(profiles=200, batch=10000):
+    start = time.perf_counter()
+    iterations = [rejection_zone_percentages()[1] for _ in range(profiles)]
+    before = (time.perf_counter() - start) / profiles
+    print(f"Rejection loop:  {before * 1000:8.3f} ms/profile, {sum(iterations) / profiles:10.0f} iterations/profile")
+
+    start = time.perf_counter()
+    for _ in range(profiles):
+        sample_zone_percentages()
+    after = (time.perf_counter() - start) / profiles
+    print(f"Exact sampler:   {after * 1000:8.3f} ms/profile, {1:10d} iterations/profile")
+
+    start = time.perf_counter()
+    sample_zone_percentages(batch)
+    batched = (time.perf_counter() - start) / batch
+    print(f"Exact, batched:  {batched * 1000:8.3f} ms/profile ({batch} partitions per call)")
+    print(f"Speed-up: {before / after:.0f}x single, {before / batched:.0f}x batched")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# compact.py
+import numpy as np
+import pandas as pd
+from parameter_ranges import PARAMETERS
+
+SCALE = 100  # Values and depths are stored in centi-units, matching the 2-decimal rounding
+INTEGER_TYPES = [np.int16, np.int32, np.int64]
+
+
+def to_centi_units(values, column):
+    """Scales 2-decimal values to integers, refusing values that would not convert back exactly."""
+    values = np.asarray(values, dtype=float)
+    scaled = np.rint(values * SCALE)
+    if np.abs(values - scaled / SCALE).max(initial=0) > 1e-9:
+        raise ValueError(f"{column} has values with more than 2 decimals; they cannot be stored losslessly.")
+    return scaled.astype(np.int64)
+
+
+class CompactEnsemble:
+    """Many profiles held as scaled integers: about 2-4 bytes per value instead of a Python float.
+
+    Parameter values and depths are stored in centi-units (int16 while every value of the
+    column fits, widened to int32/int64 otherwise) and zones as uint8. All profiles share
+    the same column arrays; offsets[i]:offsets[i + 1] are the rows of the i-th profile.
+    Converting back gives exactly the 2-decimal floats that were stored.
+    """
+
+    def __init__(self, capacity=1024):
+        self.columns = {"Depth": np.zeros(capacity, dtype=np.int32), "Zone": np.zeros(capacity, dtype=np.uint8)}
+        for param in PARAMETERS:
+            self.columns[param] = np.zeros(capacity, dtype=np.int16)
+        self.offsets = [0]
+        self.profile_ids = []
+        self.integer_depths = True  # Depth comes back as int while every stored depth was an integer
+
+    def __len__(self):
+        return len(self.profile_ids)
+
+    @property
+    def rows(self):
+        return self.offsets[-1]
+
+    @property
+    def nbytes(self):
+        """Bytes used by the stored rows (the unused capacity is not counted)."""
+        return sum(array.itemsize * self.rows for array in self.columns.values()) + 8 * len(self.offsets)
+
+    def append(self, data, profile_id=None):
+        """Adds one profile, given as {column: array}, a DataFrame or a list of row dicts."""
+        if isinstance(data, list):
+            data = pd.DataFrame(data)
+        n = len(data["Depth"])
+        start = self.rows
+        self._reserve(start + n)
+
+        depths = np.asarray(data["Depth"])
+        self.integer_depths = self.integer_depths and np.issubdtype(depths.dtype, np.integer)
+        self._store("Depth", start, to_centi_units(depths, "Depth"))
+        self.columns["Zone"][start:start + n] = np.nan_to_num(np.asarray(data["Zone"], dtype=float)).astype(np.uint8)
+        for param in PARAMETERS:
+            self._store(param, start, to_centi_units(data[param], param))
+
+        self.offsets.append(start + n)
+        self.profile_ids.append(len(self.profile_ids) if profile_id is None else profile_id)
+
+    def extend(self, profiles):
+        """Adds every profile of a {profile id: data} dict, as returned by generate_profiles."""
+        for profile_id, data in profiles.items():
+            self.append(data, profile_id)
+
+    def merge(self, other):
+        """Appends every profile of another CompactEnsemble, without converting them back to floats."""
+        start = self.rows
+        self._reserve(start + other.rows)
+        for column, array in other.columns.items():
+            self._store(column, start, array[:other.rows].astype(np.int64))
+        self.integer_depths = self.integer_depths and other.integer_depths
+        self.offsets.extend(start + offset for offset in other.offsets[1:])
+        self.profile_ids.extend(other.profile_ids)
+
+    def to_columns(self, i):
+        """Returns the i-th stored profile as {column: array}, with the original 2-decimal floats."""
+        rows = slice(self.offsets[i], self.offsets[i + 1])
+        depths = self.columns["Depth"][rows]
+        columns = {
+            "Depth": depths.astype(np.int64) // SCALE if self.integer_depths else depths / SCALE,
+            "Zone": self.columns["Zone"][rows].copy(),
+        }
+        for param in PARAMETERS:
+            columns[param] = self.columns[param][rows] / SCALE
+        return columns
+
+    def to_frame(self, i):
+        """Returns the i-th stored profile as a DataFrame."""
+        return pd.DataFrame(self.to_columns(i))
+
+    def __getitem__(self, i):
+        return self.to_columns(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.profile_ids[i], self.to_columns(i)
+
+    def _reserve(self, rows):
+        capacity = len(self.columns["Depth"])
+        if rows > capacity:
+            capacity = max(rows, 2 * capacity)
+            for column, array in self.columns.items():
+                grown = np.zeros(capacity, dtype=array.dtype)
+                grown[:self.rows] = array[:self.rows]
+                self.columns[column] = grown
+
+    def _store(self, column, start, scaled):
+        array = self.columns[column]
+        if len(scaled) and max(scaled.max(), -scaled.min()) > np.iinfo(array.dtype).max:
+            dtype = next(t for t in INTEGER_TYPES if max(scaled.max(), -scaled.min()) <= np.iinfo(t).max)
+            array = self.columns[column] = array.astype(dtype)  # Widen the whole column once
+        array[start:start + len(scaled)] = scaled
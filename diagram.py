@@ -0,0 +1,172 @@
+# diagram.py
+import io
+import time
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from matplotlib.transforms import blended_transform_factory
+from parameter_ranges import PARAMETERS
+
+PREVIEW_DPI = 80  # On-screen previews
+SAVE_DPI = 200  # Saved images
+
+
+class DiagramRenderer:
+    """Draws profiles into one reusable figure: one step-line panel per parameter, sharing the depth axis.
+
+    The figure and its panels are built once and every render only replaces the line data,
+    the axis limits and the zone boundaries. The figure is a plain matplotlib Figure, not
+    registered with pyplot, so it is freed with the renderer (or by close()) and repeated
+    renders do not accumulate figures. Since render returns that same figure every time,
+    save or copy it before the next render; one renderer is not for concurrent threads.
+    """
+
+    def __init__(self, columns=PARAMETERS, figsize=(10, 6), preview_dpi=PREVIEW_DPI, save_dpi=SAVE_DPI):
+        self.figsize = figsize
+        self.preview_dpi = preview_dpi
+        self.save_dpi = save_dpi
+        self.render_time = 0.0  # Seconds taken by the last preview or save
+        self.figure = None
+        self.build(list(columns))
+
+    def build(self, columns):
+        """Creates the figure and one panel, step line and title per column."""
+        self.close()
+        self.columns = columns
+        self.figure = Figure(figsize=self.figsize)
+        FigureCanvasAgg(self.figure)  # Gives the figure a canvas for savefig and drawing
+        axes = self.figure.subplots(nrows=1, ncols=len(columns), sharey=True, squeeze=False)[0]
+        self.axes = dict(zip(columns, axes))
+        self.lines = {}
+        self.zone_lines = []
+        for col, ax in self.axes.items():
+            self.lines[col], = ax.plot([], [], drawstyle='steps-post')
+            ax.set_title(col, fontsize=9, rotation=0, ha='center')
+            ax.tick_params(axis='both', which='major', labelsize=6)
+            ax.tick_params(axis='both', which='minor', labelsize=4)
+        self.figure.subplots_adjust(wspace=0.1)
+
+    def render(self, data, show_zones=False):
+        """Draws a profile (DataFrame, {column: array} or list of row dicts) and returns the figure.
+
+        Returns None when there is no data. The same figure is returned on every call.
+        """
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        if df.empty:
+            return None
+
+        df = df.set_index('Depth')
+        zone_ids = df.pop('Zone').to_numpy()
+        if list(df.columns) != self.columns or self.figure is None:
+            self.build(list(df.columns))
+
+        # Depths where the zone id changes, reusing the labels from generation
+        boundaries = df.index[1:][zone_ids[1:] != zone_ids[:-1]] if show_zones else []
+        for line in self.zone_lines:
+            line.remove()
+        self.zone_lines = []
+
+        depths = df.index.to_numpy()
+        for col, ax in self.axes.items():
+            self.lines[col].set_data(df[col].to_numpy(), depths)
+            ax.relim()
+            ax.autoscale_view(scaley=False)
+            for boundary in boundaries:
+                self.zone_lines.append(ax.axhline(boundary, color='grey', linewidth=0.5, linestyle='--'))
+        next(iter(self.axes.values())).set_ylim(depths.max(), 0)  # Shared: depth increases downwards
+        return self.figure
+
+    def preview(self, data, show_zones=False):
+        """Renders a profile at preview_dpi and returns it as PNG bytes, for on-screen display."""
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        if self.render(data, show_zones) is None:
+            return None
+        self.figure.savefig(buffer, format="png", dpi=self.preview_dpi)
+        self.render_time = time.perf_counter() - start
+        return buffer.getvalue()
+
+    def save(self, destination, format=None, dpi=None):
+        """Saves the last rendered profile at full quality (save_dpi, or dpi) to a path or buffer."""
+        start = time.perf_counter()
+        self.figure.savefig(destination, format=format, dpi=dpi or self.save_dpi)
+        self.render_time = time.perf_counter() - start
+
+    def close(self):
+        """Releases the figure; the next render builds a new one."""
+        if self.figure is not None:
+            self.figure.clear()
+            self.figure = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FastDiagramRenderer(DiagramRenderer):
+    """DiagramRenderer that draws every panel in a single axes, for fast previews.
+
+    With 16 sharey axes, most of the drawing time goes to laying out 32 axes' ticks. Here
+    each panel is a column of one axes: the step lines are one LineCollection, scaled to
+    their own column, and each panel shows its value range under its title instead of an
+    x axis. The collections and labels are built once and only their data changes.
+    """
+
+    PAD = 0.08  # Empty share of a panel's width on each side of its line
+
+    def build(self, columns):
+        self.close()
+        self.columns = columns
+        self.figure = Figure(figsize=self.figsize)
+        FigureCanvasAgg(self.figure)
+        self.ax = ax = self.figure.subplots()
+        self.figure.subplots_adjust(left=0.06, right=0.98, top=0.9, bottom=0.04)
+        n = len(columns)
+        ax.set_xlim(0, n)
+        ax.set_xticks([])
+        ax.tick_params(axis='y', which='major', labelsize=6)
+        ax.add_collection(LineCollection([[(i, 0), (i, 1)] for i in range(1, n)], colors='black', linewidths=0.8,
+                                         transform=blended_transform_factory(ax.transData, ax.transAxes)))
+        self.steps = ax.add_collection(LineCollection([], colors='C0', linewidths=1.0))
+        self.zone_lines = ax.add_collection(LineCollection([], colors='grey', linewidths=0.5, linestyles='--'))
+        top = blended_transform_factory(ax.transData, ax.transAxes)
+        self.ranges = []
+        for i, col in enumerate(columns):
+            ax.text(i + 0.5, 1.045, col, transform=top, fontsize=9, ha='center', va='bottom')
+            self.ranges.append(ax.text(i + 0.5, 1.005, "", transform=top, fontsize=6, ha='center', va='bottom'))
+
+    def render(self, data, show_zones=False):
+        df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
+        if df.empty:
+            return None
+
+        depths = df['Depth'].to_numpy(dtype=float)
+        zone_ids = df['Zone'].to_numpy()
+        columns = [col for col in df.columns if col not in ('Depth', 'Zone')]
+        if columns != self.columns or self.figure is None:
+            self.build(columns)
+
+        # Same path as ax.step(values, depths, where='post'): across to the next value, then down
+        step_depths = np.repeat(depths, 2)[:-1]
+        segments = []
+        for i, col in enumerate(columns):
+            values = df[col].to_numpy(dtype=float)
+            low, high = values.min(), values.max()
+            scaled = (values - low) / (high - low) if high > low else np.full(len(values), 0.5)
+            x = i + self.PAD + (1 - 2 * self.PAD) * scaled
+            segments.append(np.column_stack([np.repeat(x, 2)[1:], step_depths]))
+            self.ranges[i].set_text(f"{low:.3g}\u2013{high:.3g}")
+        self.steps.set_segments(segments)
+
+        boundaries = depths[1:][zone_ids[1:] != zone_ids[:-1]] if show_zones else []
+        self.zone_lines.set_segments([[(0, b), (len(columns), b)] for b in boundaries])
+        self.ax.set_ylim(depths.max(), 0)
+        return self.figure
+
+    def close(self):
+        super().close()
+        self.ranges = []
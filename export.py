@@ -0,0 +1,202 @@
+# export.py
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from functools import partial
+import numpy as np
+import pandas as pd
+from compact import CompactEnsemble
+from diagram import DiagramRenderer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Arrow export is optional
+    pa = pq = None
+
+HAS_PYARROW = pa is not None
+
+PROFILE_COLUMN = "Profile"
+EXPORT_CACHE_SIZE = 64  # Exports kept by export_profile
+
+
+def iter_profiles(profiles):
+    """Yields (profile id, data) from a {profile id: data} dict, a CompactEnsemble or a single profile.
+
+    Any other iterable is taken as (profile id, data) pairs and consumed as it is written,
+    so a batch generated chunk by chunk never has to be held in memory.
+    """
+    if isinstance(profiles, CompactEnsemble):
+        yield from profiles
+    elif isinstance(profiles, (list, pd.DataFrame)) or isinstance(profiles, dict) and "Depth" in profiles:
+        yield 0, profiles
+    elif isinstance(profiles, dict):
+        yield from profiles.items()
+    else:
+        yield from profiles
+
+
+def profile_table(data, profile_id):
+    """Returns one profile as an Arrow table, with the profile id as its first column."""
+    if isinstance(data, list):
+        data = pd.DataFrame(data)
+    columns = {name: np.asarray(values) for name, values in data.items()}
+    n = len(columns["Depth"])
+    columns["Zone"] = np.nan_to_num(columns["Zone"].astype(float)).astype(np.uint8)  # Row data uses None for no zone
+    table = pa.table(columns)
+    return table.add_column(0, PROFILE_COLUMN, pa.array(np.full(n, profile_id)))
+
+
+def _require_pyarrow():
+    if not HAS_PYARROW:
+        raise ValueError("Parquet and Arrow export need pyarrow (pip install pyarrow).")
+
+
+def write_csv(profiles, destination):
+    """Writes profiles to one CSV file (path or text buffer), with the profile id as the first column."""
+    if isinstance(destination, str):
+        with open(destination, "w", newline="") as file:
+            return write_csv(profiles, file)
+    header = True
+    for profile_id, data in iter_profiles(profiles):
+        frame = pd.DataFrame(data)
+        frame.insert(0, PROFILE_COLUMN, profile_id)
+        frame.to_csv(destination, index=False, header=header)
+        header = False
+
+
+def write_parquet(profiles, destination, compression="zstd"):
+    """Writes profiles to a Parquet file, one row group per profile, with column statistics.
+
+    profiles can be the output of generate_profiles (a dict or a CompactEnsemble), an
+    iterator of (profile id, data) pairs, or a single profile as columns, a DataFrame or rows. Each profile is converted and written
+    on its own, so a large batch is never held as one table. Readers can then load single
+    columns, or skip whole profiles using the Profile column statistics.
+    """
+    _require_pyarrow()
+    writer = None
+    try:
+        for profile_id, data in iter_profiles(profiles):
+            table = profile_table(data, profile_id)
+            if writer is None:
+                writer = pq.ParquetWriter(destination, table.schema, compression=compression, write_statistics=True)
+            writer.write_table(table, row_group_size=max(1, table.num_rows))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_arrow(profiles, destination):
+    """Writes profiles to an Arrow IPC file, one record batch per profile."""
+    _require_pyarrow()
+    writer = None
+    try:
+        for profile_id, data in iter_profiles(profiles):
+            table = profile_table(data, profile_id)
+            if writer is None:
+                writer = pa.ipc.new_file(destination, table.schema)
+            writer.write_table(table, max_chunksize=max(1, table.num_rows))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def parquet_bytes(profiles, compression="zstd"):
+    """Returns the Parquet file of the profiles as bytes, e.g. for a download button."""
+    buffer = io.BytesIO()
+    write_parquet(profiles, buffer, compression)
+    return buffer.getvalue()
+
+
+def arrow_bytes(profiles):
+    """Returns the Arrow IPC file of the profiles as bytes."""
+    buffer = io.BytesIO()
+    write_arrow(profiles, buffer)
+    return buffer.getvalue()
+
+
+def profile_key(frame):
+    """Content hash of a profile DataFrame, used to cache its exports."""
+    digest = hashlib.sha1(",".join(map(str, frame.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def csv_bytes(frame):
+    return frame.to_csv(index=False).encode('utf-8')
+
+
+def xlsx_bytes(frame):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        frame.to_excel(writer, index=False, sheet_name='Profile Data')
+    return buffer.getvalue()
+
+
+def diagram_bytes(frame, format="png"):
+    """Draws the full diagram of a profile at save quality, in its own figure (safe to call from any thread)."""
+    buffer = io.BytesIO()
+    with DiagramRenderer() as renderer:
+        renderer.render(frame)
+        renderer.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+# Single-profile exports by format: bytes from a profile DataFrame
+EXPORTERS = {
+    "csv": csv_bytes,
+    "xlsx": xlsx_bytes,
+    "parquet": parquet_bytes,
+    "png": partial(diagram_bytes, format="png"),
+    "svg": partial(diagram_bytes, format="svg"),
+}
+
+
+_export_cache = OrderedDict()  # (profile key, format) -> bytes, least recently used first
+_export_lock = threading.Lock()
+
+
+def export_profile(key, file_format, frame):
+    """Builds one download of a profile, once per profile content (key, see profile_key) and format.
+
+    The last EXPORT_CACHE_SIZE exports are kept in the process, so every session and rerun
+    showing the same profile reuses them.
+    """
+    with _export_lock:
+        if (key, file_format) in _export_cache:
+            _export_cache.move_to_end((key, file_format))
+            return _export_cache[(key, file_format)]
+    data = EXPORTERS[file_format](frame)
+    with _export_lock:
+        _export_cache[(key, file_format)] = data
+        while len(_export_cache) > EXPORT_CACHE_SIZE:
+            _export_cache.popitem(last=False)
+    return data
+
+
+# Download buttons of a profile: (section header, label, format, file name, MIME type)
+DOWNLOADS = [
+    ("Save Data", "Download data as CSV", "csv", "paleo_profile.csv", "text/csv"),
+    ("Save Data", "Download data as Excel", "xlsx", "paleo_profile.xlsx",
+     "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+] + ([("Save Data", "Download data as Parquet", "parquet", "paleo_profile.parquet", "application/vnd.apache.parquet")]
+     if HAS_PYARROW else []) + [
+    ("Save Diagram", "Download Diagram as PNG", "png", "paleo_profile_diagram.png", "image/png"),
+    ("Save Diagram", "Download Diagram as SVG", "svg", "paleo_profile_diagram.svg", "image/svg+xml"),
+]
+
+
+def add_download_buttons(container, frame, key):
+    """Adds the DOWNLOADS buttons of a profile to a Streamlit container, e.g. st.sidebar.
+
+    Each file is built by export_profile when its button is clicked, not on every rerun,
+    and clicking does not rerun the app.
+    """
+    section = None
+    for header, label, file_format, file_name, mime in DOWNLOADS:
+        if header != section:
+            container.header(header)
+            section = header
+        container.download_button(label=label, data=partial(export_profile, key, file_format, frame),
+                                  file_name=file_name, mime=mime, on_click="ignore")
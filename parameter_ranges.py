@@ -0,0 +1,338 @@
+# parameter_ranges.py
+from types import MappingProxyType
+
+ZONES = [1, 2, 3, 4, 5]
+BASE_TYPES = ["Rock", "Sand", "Paleosol", "Lake sediment"]
+ENV_TYPES = ["Lake", "Peatland", "Wetland"]
+# Column order of a generated profile (after Depth and Zone)
+PARAMETERS = ["OM", "CC", "IM", "Clay", "Silt", "Sand", "MS", "CH", "AP", "NAP", "WL", "CR", "Ca", "Mg", "Na", "K"]
+TRENDS = ["UP", "DN", "LF", "HF", "SP", "SL", "SH", "UD", "DU", "RM"]
+NO_RANGE = MappingProxyType({})
+
+# Zone 5 depends on the base type, zones 1-4 on the environment type: (min, max, trend)
+DEFAULT_RANGES = {
+    (5, "Rock"): {
+        "OM": (0, 0, "LF"),
+        "IM": (70, 95, "LF"),
+        "CC": (12, 30, "LF"),
+        "Clay": (0, 5, "LF"),
+        "Silt": (5, 15, "HF"),
+        "Sand": (70, 90, "HF"),
+        "MS": (130, 220, "HF"),
+        "CH": (0, 0, "SP"),
+        "AP": (0, 0, "LF"),
+        "NAP": (0, 0, "LF"),
+        "WL": (0, 0, "LF"),
+        "CR": (0, 0, "LF"),
+        "Ca": (270, 400, "HF"),
+        "Mg": (250, 330, "HF"),
+        "Na": (300, 400, "HF"),
+        "K": (300, 400, "HF"),
+    },
+    (5, "Sand"): {
+        "OM": (0, 0, "LF"),
+        "IM": (70, 95, "LF"),
+        "CC": (5, 20, "LF"),
+        "Clay": (0, 5, "UP"),
+        "Silt": (0, 10, "UP"),
+        "Sand": (85, 95, "UP"),
+        "MS": (150, 200, "LF"),
+        "CH": (0, 0, "SP"),
+        "AP": (20, 60, "LF"),
+        "NAP": (0, 20, "LF"),
+        "WL": (0, 0, "LF"),
+        "CR": (30, 90, "LF"),
+        "Ca": (70, 100, "LF"),
+        "Mg": (50, 90, "LF"),
+        "Na": (100, 150, "LF"),
+        "K": (100, 140, "LF"),
+    },
+    (5, "Paleosol"): {
+        "OM": (0, 30, "LF"),
+        "IM": (30, 80, "LF"),
+        "CC": (0, 30, "LF"),
+        "Clay": (0, 30, "LF"),
+        "Silt": (0, 30, "LF"),
+        "Sand": (0, 90, "LF"),
+        "MS": (100, 150, "LF"),
+        "CH": (0, 10, "SP"),
+        "AP": (130, 280, "LF"),
+        "NAP": (10, 90, "LF"),
+        "WL": (40, 100, "LF"),
+        "CR": (60, 90, "LF"),
+        "Ca": (100, 200, "HF"),
+        "Mg": (100, 130, "HF"),
+        "Na": (100, 200, "LF"),
+        "K": (100, 200, "LF"),
+    },
+    (5, "Lake sediment"): {
+        "OM": (5, 20, "LF"),
+        "IM": (40, 90, "LF"),
+        "CC": (5, 30, "LF"),
+        "Clay": (10, 20, "LF"),
+        "Silt": (10, 60, "LF"),
+        "Sand": (20, 40, "LF"),
+        "MS": (100, 150, "LF"),
+        "CH": (0, 10, "SP"),
+        "AP": (120, 260, "LF"),
+        "NAP": (20, 90, "LF"),
+        "WL": (10, 30, "UP"),
+        "CR": (130, 290, "LF"),
+        "Ca": (130, 200, "HF"),
+        "Mg": (90, 130, "HF"),
+        "Na": (200, 300, "LF"),
+        "K": (200, 300, "LF"),
+    },
+    (4, "Lake"): {
+        "OM": (5, 20, "LF"),
+        "IM": (40, 80, "LF"),
+        "CC": (5, 35, "LF"),
+        "Clay": (10, 20, "LF"),
+        "Silt": (10, 60, "LF"),
+        "Sand": (20, 40, "LF"),
+        "MS": (100, 150, "LF"),
+        "CH": (0, 0, "SP"),
+        "AP": (100, 160, "LF"),
+        "NAP": (20, 40, "HF"),
+        "WL": (20, 50, "HF"),
+        "CR": (115, 250, "LF"),
+        "Ca": (150, 190, "HF"),
+        "Mg": (110, 140, "HF"),
+        "Na": (220, 310, "HF"),
+        "K": (210, 330, "LF"),
+    },
+    (4, "Peatland"): {
+        "OM": (30, 60, "UP"),
+        "IM": (40, 80, "UP"),
+        "CC": (5, 10, "UP"),
+        "Clay": (10, 20, "UP"),
+        "Silt": (10, 60, "UP"),
+        "Sand": (20, 40, "UP"),
+        "MS": (100, 150, "LF"),
+        "CH": (0, 8, "SP"),
+        "AP": (45, 199, "LF"),
+        "NAP": (40, 80, "HF"),
+        "WL": (40, 140, "HF"),
+        "CR": (30, 90, "LF"),
+        "Ca": (130, 200, "LF"),
+        "Mg": (90, 130, "LF"),
+        "Na": (200, 300, "LF"),
+        "K": (200, 300, "LF"),
+    },
+    (4, "Wetland"): {
+        "OM": (5, 30, "LF"),
+        "IM": (40, 90, "LF"),
+        "CC": (5, 30, "LF"),
+        "Clay": (10, 20, "LF"),
+        "Silt": (10, 60, "LF"),
+        "Sand": (20, 40, "LF"),
+        "MS": (100, 150, "LF"),
+        "CH": (0, 0, "SP"),
+        "AP": (45, 199, "LF"),
+        "NAP": (40, 80, "HF"),
+        "WL": (140, 240, "HF"),
+        "CR": (50, 120, "LF"),
+        "Ca": (130, 200, "HF"),
+        "Mg": (90, 130, "HF"),
+        "Na": (200, 300, "HF"),
+        "K": (200, 300, "HF"),
+    },
+    (3, "Lake"): {
+        "OM": (9, 18, "LF"),
+        "IM": (40, 90, "LF"),
+        "CC": (5, 30, "LF"),
+        "Clay": (5, 40, "LF"),
+        "Silt": (5, 60, "LF"),
+        "Sand": (5, 60, "LF"),
+        "MS": (100, 150, "HF"),
+        "CH": (0, 5, "SP"),
+        "AP": (45, 199, "LF"),
+        "NAP": (40, 80, "HF"),
+        "WL": (40, 140, "HF"),
+        "CR": (30, 90, "LF"),
+        "Ca": (130, 200, "HF"),
+        "Mg": (90, 130, "LF"),
+        "Na": (200, 300, "HF"),
+        "K": (200, 300, "HF"),
+    },
+    (3, "Peatland"): {
+        "OM": (30, 60, "UP"),
+        "IM": (20, 60, "UP"),
+        "CC": (5, 30, "UP"),
+        "Clay": (5, 40, "UP"),
+        "Silt": (5, 60, "UP"),
+        "Sand": (5, 40, "UP"),
+        "MS": (50, 100, "LF"),
+        "CH": (0, 5, "SP"),
+        "AP": (45, 199, "LF"),
+        "NAP": (40, 80, "HF"),
+        "WL": (220, 340, "HF"),
+        "CR": (0, 30, "SP"),
+        "Ca": (130, 200, "LF"),
+        "Mg": (90, 130, "LF"),
+        "Na": (200, 300, "LF"),
+        "K": (200, 300, "LF"),
+    },
+    (3, "Wetland"): {
+        "OM": (10, 30, "LF"),
+        "IM": (30, 70, "LF"),
+        "CC": (20, 40, "LF"),
+        "Clay": (10, 40, "LF"),
+        "Silt": (20, 60, "LF"),
+        "Sand": (10, 50, "LF"),
+        "MS": (40, 70, "LF"),
+        "CH": (0, 5, "SP"),
+        "AP": (45, 199, "LF"),
+        "NAP": (40, 80, "HF"),
+        "WL": (220, 340, "HF"),
+        "CR": (0, 30, "SP"),
+        "Ca": (830, 1400, "LF"),
+        "Mg": (390, 530, "LF"),
+        "Na": (200, 300, "LF"),
+        "K": (200, 300, "LF"),
+    },
+    (2, "Lake"): {
+        "OM": (10, 30, "LF"),
+        "IM": (40, 80, "HF"),
+        "CC": (5, 40, "HF"),
+        "Clay": (5, 40, "HF"),
+        "Silt": (5, 60, "HF"),
+        "Sand": (5, 60, "LF"),
+        "MS": (50, 80, "LF"),
+        "CH": (0, 0, "SP"),
+        "AP": (45, 199, "LF"),
+        "NAP": (40, 80, "HF"),
+        "WL": (220, 340, "HF"),
+        "CR": (0, 10, "SP"),
+        "Ca": (630, 1200, "LF"),
+        "Mg": (190, 230, "LF"),
+        "Na": (200, 300, "LF"),
+        "K": (200, 300, "LF"),
+    },
+    (2, "Peatland"): {
+        "OM": (80, 99, "RM"),
+        "IM": (1, 10, "HF"),
+        "CC": (1, 5, "HF"),
+        "Clay": (20, 60, "UP"),
+        "Silt": (20, 60, "UP"),
+        "Sand": (1, 5, "UP"),
+        "MS": (20, 40, "LF"),
+        "CH": (0, 0, "SP"),
+        "AP": (45, 80, "LF"),
+        "NAP": (140, 180, "HF"),
+        "WL": (220, 340, "HF"),
+        "CR": (0, 10, "SP"),
+        "Ca": (630, 1200, "LF"),
+        "Mg": (190, 230, "LF"),
+        "Na": (500, 600, "LF"),
+        "K": (500, 600, "LF"),
+    },
+    (2, "Wetland"): {
+        "OM": (50, 90, "LF"),
+        "IM": (5, 30, "HF"),
+        "CC": (5, 15, "HF"),
+        "Clay": (20, 60, "LF"),
+        "Silt": (20, 60, "LF"),
+        "Sand": (1, 5, "LF"),
+        "MS": (120, 140, "HF"),
+        "CH": (0, 10, "SP"),
+        "AP": (45, 80, "LF"),
+        "NAP": (140, 180, "HF"),
+        "WL": (220, 340, "HF"),
+        "CR": (0, 10, "SP"),
+        "Ca": (130, 200, "LF"),
+        "Mg": (90, 130, "LF"),
+        "Na": (500, 600, "LF"),
+        "K": (500, 600, "LF"),
+    },
+    (1, "Lake"): {
+        "OM": (5, 15, "RM"),
+        "IM": (40, 80, "RM"),
+        "CC": (5, 30, "RM"),
+        "Clay": (5, 40, "LF"),
+        "Silt": (10, 60, "LF"),
+        "Sand": (20, 60, "LF"),
+        "MS": (150, 300, "HF"),
+        "CH": (0, 15, "SP"),
+        "AP": (145, 180, "LF"),
+        "NAP": (340, 480, "HF"),
+        "WL": (220, 340, "HF"),
+        "CR": (0, 30, "SP"),
+        "Ca": (190, 240, "LF"),
+        "Mg": (90, 130, "LF"),
+        "Na": (400, 600, "LF"),
+        "K": (400, 500, "LF"),
+    },
+    (1, "Peatland"): {
+        "OM": (25, 70, "HF"),
+        "IM": (40, 80, "RM"),
+        "CC": (5, 20, "RM"),
+        "Clay": (5, 40, "LF"),
+        "Silt": (10, 60, "LF"),
+        "Sand": (20, 60, "LF"),
+        "MS": (150, 300, "HF"),
+        "CH": (0, 15, "SP"),
+        "AP": (145, 180, "LF"),
+        "NAP": (340, 480, "HF"),
+        "WL": (220, 340, "HF"),
+        "CR": (0, 30, "SP"),
+        "Ca": (190, 240, "LF"),
+        "Mg": (90, 130, "LF"),
+        "Na": (600, 900, "LF"),
+        "K": (600, 900, "LF"),
+    },
+    (1, "Wetland"): {
+        "OM": (30, 70, "HF"),
+        "IM": (10, 80, "HF"),
+        "CC": (5, 30, "HF"),
+        "Clay": (5, 20, "LF"),
+        "Silt": (30, 60, "LF"),
+        "Sand": (40, 70, "LF"),
+        "MS": (400, 700, "LF"),
+        "CH": (0, 15, "SP"),
+        "AP": (145, 280, "LF"),
+        "NAP": (340, 480, "LF"),
+        "WL": (220, 340, "LF"),
+        "CR": (0, 30, "SP"),
+        "Ca": (130, 250, "LF"),
+        "Mg": (90, 230, "LF"),
+        "Na": (800, 900, "LF"),
+        "K": (800, 900, "LF"),
+    },
+}
+
+
+class RangeTable:
+    """Parameter ranges compiled once into read-only lookups, with custom overrides merged in.
+
+    lookup() returns the same read-only dict of (min, max, trend) tuples that
+    get_parameter_ranges always returned.
+    """
+
+    def __init__(self, custom_ranges=None):
+        self.custom_ranges = MappingProxyType(dict(custom_ranges or {}))
+        ranges = {}
+        for zone_num in ZONES:
+            for base_type in BASE_TYPES:
+                for env_type in ENV_TYPES:
+                    key = (zone_num, base_type, env_type)
+                    default = DEFAULT_RANGES[(zone_num, base_type if zone_num == 5 else env_type)]
+                    ranges[key] = self.custom_ranges.get(key, default)
+        ranges.update(self.custom_ranges)  # Overrides outside the grid are still honoured by lookup()
+
+        self.ranges = MappingProxyType({key: MappingProxyType(dict(value)) for key, value in ranges.items()})
+
+    def lookup(self, zone_num, base_type, env_type):
+        """Returns the {param: (min, max, trend)} ranges of one zone, or an empty dict if there are none."""
+        ranges = self.ranges.get((zone_num, base_type, env_type))
+        if ranges is None:  # Zones 1-4 do not depend on the base type, nor zone 5 on the env type
+            ranges = DEFAULT_LOOKUP.get((zone_num, base_type if zone_num == 5 else env_type), NO_RANGE)
+        return ranges
+
+    def __reduce__(self):
+        # The read-only views do not pickle; recompile from the overrides instead
+        return (RangeTable, (dict(self.custom_ranges),))
+
+
+DEFAULT_LOOKUP = MappingProxyType({key: MappingProxyType(value) for key, value in DEFAULT_RANGES.items()})
+DEFAULT_RANGE_TABLE = RangeTable()
@@ -0,0 +1,93 @@
+# ppr_cli.py
+# Headless batch generation, without tkinter or streamlit:
+#   python -m ppr_cli generate --depth-choice 3 --base Rock --env Lake --count 50000 --workers 16 --out data/
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from export import write_arrow, write_csv, write_parquet
+from parameter_ranges import BASE_TYPES, ENV_TYPES
+from profile_generator import ENGINES, ProfileGenerator, generate_profile_chunk
+from profile_stats import ProfileStats
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "arrow": write_arrow}
+
+
+def parse_step(text):
+    """Keeps an integer step as int, so depths stay integers."""
+    step = float(text)
+    if not step > 0:
+        raise argparse.ArgumentTypeError(f"must be a positive number of cm, got {text}")
+    return int(step) if step.is_integer() else step
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m ppr_cli", description="PPR - Paleo Profile Randomizer, batch mode.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Generate a batch of profiles into files.")
+    generate.add_argument("--depth-choice", type=int, choices=range(1, 7), default=1,
+                          help="Depth range: 1 = 50-100 cm ... 6 = 500-600 cm (default 1).")
+    generate.add_argument("--depth", type=float, help="Fixed total depth in cm, instead of a depth choice.")
+    generate.add_argument("--step", type=parse_step, default=2, help="Sampling interval in cm (default 2).")
+    generate.add_argument("--base", choices=BASE_TYPES, required=True, help="Base type.")
+    generate.add_argument("--env", choices=ENV_TYPES, required=True, help="Environment type.")
+    generate.add_argument("--count", type=int, default=1, help="Number of profiles (default 1).")
+    generate.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: all CPUs).")
+    generate.add_argument("--chunk-size", type=int, default=1000, help="Profiles per task and per output file (default 1000).")
+    generate.add_argument("--seed", type=int, help="Seed of the batch; the same seed gives the same profiles.")
+    generate.add_argument("--engine", choices=ENGINES, default="numpy", help="Generation engine (default numpy).")
+    generate.add_argument("--format", choices=WRITERS, default="parquet", help="Output format (default parquet).")
+    generate.add_argument("--out", default=".", help="Output directory (default: current directory).")
+    generate.add_argument("--stats", action="store_true", help="Print the stage timings and counters of the batch at the end.")
+    return parser
+
+
+def generate(args):
+    """Generates args.count profiles in chunks, writing one file per chunk as soon as it is ready."""
+    if args.count < 1 or args.chunk_size < 1 or args.workers < 1:
+        raise ValueError("--count, --chunk-size and --workers must be at least 1.")
+    os.makedirs(args.out, exist_ok=True)
+    generator = ProfileGenerator()
+    root = np.random.SeedSequence(args.seed)
+    chunks = [range(start, min(start + args.chunk_size, args.count)) for start in range(0, args.count, args.chunk_size)]
+    task = (args.depth_choice, args.base, args.env, args.engine, root, args.depth, args.step, "columns", True)
+    arguments = [[generator] * len(chunks), chunks] + [[arg] * len(chunks) for arg in task]
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    results = (executor.map if executor else map)(generate_profile_chunk, *arguments)
+    start = time.perf_counter()
+    done = rows = 0
+    batch_stats = ProfileStats()
+    try:
+        for number, (profiles, chunk_stats) in enumerate(results):
+            batch_stats.merge(chunk_stats)
+            path = os.path.join(args.out, f"profiles-{number:05d}.{args.format}")
+            WRITERS[args.format](profiles, path)
+            done += len(profiles)
+            rows += sum(len(columns["Depth"]) for columns in profiles.values())
+            elapsed = time.perf_counter() - start
+            print(f"{done}/{args.count} profiles, {rows} rows, {done / elapsed:.1f} profiles/s, {rows / elapsed:.0f} rows/s",
+                  file=sys.stderr)
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    if args.stats:
+        print(batch_stats.report(), file=sys.stderr)
+    return done
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        generate(args)
+    except ValueError as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,52 +1,204 @@
 # profile_generator.py
 import random
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import matplotlib
-import matplotlib.pyplot as plt
 matplotlib.use('Agg')  # Use Agg backend to save plots
+from compact import CompactEnsemble
+from diagram import DiagramRenderer, FastDiagramRenderer
+from parameter_ranges import DEFAULT_RANGE_TABLE, PARAMETERS, RangeTable
+from profile_stats import NO_STATS, ProfileStats
+from samplers import ZONE_PERCENTAGE_BOUNDS, sample_compositions, sample_zone_percentages
+
+VALUE_PARAMETERS = ["MS", "CH", "AP", "NAP", "WL", "CR", "Ca", "Mg", "Na", "K"]
+COMPOSITIONS = [("OM", "CC", "IM"), ("Clay", "Silt", "Sand")]  # Triples that sum to 100
+ENGINES = ("python", "numpy")  # "python": row by row, "numpy": column oriented
+OUTPUTS = ("rows", "columns", "frame")  # List of row dicts, {column: array} or pandas DataFrame
+PARAMETER_INDEX = {param: i for i, param in enumerate(PARAMETERS)}
+
+
+def spawn_seeds(seed, profile_ids):
+    """Returns the SeedSequence of each profile id: child i of the root sequence built from seed.
+
+    Matches SeedSequence(seed).spawn(n)[i], but can be computed for any subset of ids, so every
+    worker of a batch derives the same streams on its own.
+    """
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (int(i),)) for i in profile_ids]
+
+
+def depth_grid(row_indices, step=2):
+    """Depths (cm) of the given sample rows; integers for an integer step, else rounded to 1e-6 cm."""
+    depths = np.asarray(row_indices) * step
+    return depths if isinstance(step, int) else np.round(depths, 6)
+
+
+def count_rows(depth, step=2):
+    """Number of samples from the top (0) down to depth, both included; the grid never runs past depth."""
+    if step <= 0:
+        raise ValueError(f"The step must be positive, got {step}.")
+    if depth < 0:
+        raise ValueError(f"The depth must not be negative, got {depth}.")
+    return int(np.floor(depth / step + 1e-9)) + 1  # The tolerance keeps e.g. 0.3 / 0.1 at 3
+
+
+def generate_profile_chunk(generator, profile_ids, depth_choice, base_type, env_type, engine, seed, depth=None, step=2,
+                           output="columns", stats=False):
+    """Generates the given profile ids of a batch as {profile id: {column: array}} or a CompactEnsemble (a process pool task).
+
+    With stats=True, returns (profiles, ProfileStats of the chunk).
+    """
+    profiles = {}
+    ensemble = CompactEnsemble() if output == "compact" else None
+    chunk_stats = ProfileStats() if stats else NO_STATS
+    rngs = [np.random.default_rng(profile_seed) for profile_seed in spawn_seeds(seed, profile_ids)]
+    drawn = generator.draw_depths_and_zones(depth_choice, rngs, depth, step, chunk_stats)  # Zones of the chunk in one call
+    for profile_id, rng, (profile_depth, zones) in zip(profile_ids, rngs, drawn):
+        if engine == "numpy":
+            profiles[profile_id] = generator.generate_columns(profile_depth, zones, base_type, env_type, rng, step, chunk_stats)
+        else:
+            data = generator.generate_data(profile_depth, zones, base_type, env_type, engine, rng, step, chunk_stats)
+            profiles[profile_id] = generator.rows_to_columns(data)
+        chunk_stats.count("profiles")
+        if ensemble is not None:
+            ensemble.append(profiles.pop(profile_id), profile_id)
+    result = profiles if ensemble is None else ensemble
+    return (result, chunk_stats) if stats else result
+
+
+class TrendState:
+    """Random-walk state of the trends for one profile, one slot per parameter index.
+
+    Every generation call creates its own state, so nothing carries over between profiles
+    and a single ProfileGenerator can serve several threads at once. The last slot holds
+    values whose parameter has no name.
+    """
+    __slots__ = ("up", "dn", "lf", "sl_center", "sl_last", "sh_center", "sh_last", "stats")
+
+    def __init__(self, stats=NO_STATS):
+        for slot in self.__slots__[:-1]:
+            setattr(self, slot, [None] * (len(PARAMETERS) + 1))
+        self.stats = stats  # Instrumentation of the generation call that owns this state
+
+    @staticmethod
+    def index(param):
+        return PARAMETER_INDEX.get(param, len(PARAMETERS))
+
 
 class ProfileGenerator:
     def __init__(self):
-        self.custom_ranges = {}  # Store custom ranges
+        self.range_table = DEFAULT_RANGE_TABLE  # Compiled ranges, including custom overrides
         self.zones = [1, 2, 3, 4, 5] # Define possible zones
-
-    def generate_unique_zone_percentages(self):
-        """Generates 5 unique random numbers that sum to 100."""
-        while True:
-            z1 = random.uniform(10, 20)
-            z2 = random.uniform(25, 60)
-            z3 = random.uniform(30, 60)
-            z4 = random.uniform(20, 40)
-            z5 = random.uniform(5, 10)
-            total = round(z1 + z2 + z3 + z4 + z5, 2)
-            if  100-0.02 <= total <= 100+0.02:  #check the rounding
-                nums = [z1, z2, z3, z4, z5]
-                if len(set(nums)) == 5: #Check for uniqueness
-                    return nums
-
-    def assign_depths_to_zones(self, depth, zone_percentages):
-        """Assigns depths to zones based on percentages."""
+        self._renderer = None  # Diagram figure, built on the first generate_diagram
+        self._preview_renderer = None  # Same for preview_diagram
+        self._diagram_lock = threading.Lock()  # One thread at a time draws into the figures
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_renderer"] = state["_preview_renderer"] = None  # Process pool workers do not need the figures
+        del state["_diagram_lock"]  # Locks cannot be pickled
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._diagram_lock = threading.Lock()
+
+    # Both renderers reuse one figure per generator: generate_diagram returns the same figure
+    # every time, so save or copy it before the next call. _diagram_lock serializes threads;
+    # a thread that needs a figure of its own should use its own DiagramRenderer.
+    @property
+    def renderer(self):
+        """The DiagramRenderer that generate_diagram draws into."""
+        if self._renderer is None:
+            self._renderer = DiagramRenderer()
+        return self._renderer
+
+    @property
+    def preview_renderer(self):
+        """The FastDiagramRenderer that preview_diagram draws into."""
+        if self._preview_renderer is None:
+            self._preview_renderer = FastDiagramRenderer()
+        return self._preview_renderer
+
+    @property
+    def custom_ranges(self):
+        """Custom overrides keyed by (zone, base type, env type), read-only; see apply_custom_ranges."""
+        return self.range_table.custom_ranges
+
+    @custom_ranges.setter
+    def custom_ranges(self, custom_ranges):
+        self.range_table = RangeTable(custom_ranges)
+
+    def apply_custom_ranges(self, zone_num, base_type, env_type, ranges):
+        """Overrides the ranges of one zone/base/env combination and recompiles the range table."""
+        custom_ranges = dict(self.custom_ranges)
+        custom_ranges[(zone_num, base_type, env_type)] = ranges
+        self.custom_ranges = custom_ranges
+
+    def generate_unique_zone_percentages(self, rng=None):
+        """Generates 5 random zone percentages that sum to 100 (continuous draws, so unique)."""
+        return sample_zone_percentages(rng=rng).tolist()
+
+    def assign_depths_to_zones(self, depth, zone_percentages, step=2):
+        """Assigns depths to zones based on percentages, with boundaries on the sampling grid."""
         zones = {}
         current_depth = 0
+        last_row = count_rows(depth, step) - 1
         for i, percentage in enumerate(zone_percentages):
             zone_end = current_depth + (depth * percentage / 100)
-            zones[i + 1] = (current_depth, float(round(zone_end / 2) * 2))
-            current_depth = float(round(zone_end / 2) * 2)
+            zones[i + 1] = (current_depth, float(depth_grid(min(round(zone_end / step), last_row), step)))
+            current_depth = zones[i + 1][1]
+        if zones:  # Rounding can leave the last zone a step short of the last sample
+            last = len(zones)
+            zones[last] = (zones[last][0], float(depth_grid(last_row, step)))
         return zones
 
-    def generate_data(self, depth, zones, base_type, env_type):
-        """Generates the data for the table."""
+    def zone_boundaries(self, zones):
+        """Converts assign_depths_to_zones output to arrays of zone numbers, starts and ends, sorted by depth."""
+        numbers = np.array(list(zones), dtype=np.uint8)
+        starts = np.array([start for start, _ in zones.values()], dtype=float)
+        ends = np.array([end for _, end in zones.values()], dtype=float)
+        order = np.argsort(ends, kind="stable")
+        return numbers[order], starts[order], ends[order]
+
+    def assign_zone_ids(self, depth_values, zones):
+        """Labels every depth with its zone number in one pass (0 where no zone covers it).
+
+        Like the original per-row scan, a depth shared by two zones belongs to the upper one.
+        """
+        depth_values = np.asarray(depth_values)
+        if not zones:
+            return np.zeros(len(depth_values), dtype=np.uint8)
+        numbers, starts, ends = self.zone_boundaries(zones)
+        index = np.minimum(np.searchsorted(ends, depth_values, side="left"), len(ends) - 1)
+        inside = (depth_values >= starts[index]) & (depth_values <= ends[index])
+        return np.where(inside, numbers[index], 0).astype(np.uint8)
+
+    def generate_data(self, depth, zones, base_type, env_type, engine="python", rng=None, step=2, stats=NO_STATS):
+        """Generates the data for the table, one row every step cm.
+
+        rng is an optional NumPy Generator for reproducible output, and stats an optional
+        ProfileStats that records the stage timings and counters.
+        """
+        if engine == "numpy":
+            return self.columns_to_rows(self.generate_columns(depth, zones, base_type, env_type, rng, step, stats))
+        if engine != "python":
+            raise ValueError(f"Unknown engine: {engine}")
+        rng = random if rng is None else random.Random(int(rng.integers(2**63)))
+
         data = []
-        depth_values = list(range(0, depth + 1, 2))
+        depth_values = depth_grid(np.arange(count_rows(depth, step)), step).tolist()
+        zone_ids = self.assign_zone_ids(depth_values, zones).tolist()
+        state = TrendState(stats)
 
-        for d in depth_values:
-            zone_num = None
-            for z, (start, end) in zones.items():
-                if start <= d <= end:
-                    zone_num = z
-                    break
+        for d, zone_num in zip(depth_values, zone_ids):
+            zone_num = zone_num or None  # 0: no zone covers this depth
 
-            ranges = self.get_parameter_ranges(base_type, env_type, zone_num)
+            with stats.timer("ranges"):
+                ranges = self.get_parameter_ranges(base_type, env_type, zone_num)
 
             row = {
                 "Depth": d,
@@ -56,163 +208,354 @@ class ProfileGenerator:
             }
 
             all_params = ["MS", "CH", "AP", "NAP", "WL", "CR", "Ca", "Mg", "Na", "K"]
-            for param in all_params:
-                if param in ranges:
-                    min_val, max_val, trend = ranges[param]
-                    row[param] = self.generate_value(d, depth, min_val, max_val, trend, param, zone_num, zones, data)
+            with stats.timer("values"):
+                for param in all_params:
+                    if param in ranges:
+                        min_val, max_val, trend = ranges[param]
+                        row[param] = self.generate_value(d, depth, min_val, max_val, trend, param, zone_num, zones, data, state, rng)
+                    else:
+                        row[param] = 0
+
+            with stats.timer("compositions"):
+                if "OM" not in ranges:
+                    row["OM"], row["CC"], row["IM"] = 0, 0, 0
                 else:
-                    row[param] = 0
-
-            if "OM" not in ranges:
-                row["OM"], row["CC"], row["IM"] = 0, 0, 0
-            else:
-                row["OM"], row["CC"], row["IM"] = self.generate_sum_to_100(
-                    ranges["OM"][0], ranges["OM"][1], ranges["OM"][2],
-                    ranges["CC"][0], ranges["CC"][1], ranges["CC"][2],
-                    ranges["IM"][0], ranges["IM"][1], ranges["IM"][2],
-                    d, depth
-                )
-            if "Clay" not in ranges:
-                row["Clay"], row["Silt"], row["Sand"] = 0, 0, 0
-            else:
-                row["Clay"], row["Silt"], row["Sand"] = self.generate_sum_to_100(
-                    ranges["Clay"][0], ranges["Clay"][1], ranges["Clay"][2],
-                    ranges["Silt"][0], ranges["Silt"][1], ranges["Silt"][2],
-                    ranges["Sand"][0], ranges["Sand"][1], ranges["Sand"][2],
-                    d, depth
-                )
+                    row["OM"], row["CC"], row["IM"] = self.generate_sum_to_100(
+                        ranges["OM"][0], ranges["OM"][1], ranges["OM"][2],
+                        ranges["CC"][0], ranges["CC"][1], ranges["CC"][2],
+                        ranges["IM"][0], ranges["IM"][1], ranges["IM"][2],
+                        d, depth, ("OM", "CC", "IM"), zone_num, zones, state, rng
+                    )
+                if "Clay" not in ranges:
+                    row["Clay"], row["Silt"], row["Sand"] = 0, 0, 0
+                else:
+                    row["Clay"], row["Silt"], row["Sand"] = self.generate_sum_to_100(
+                        ranges["Clay"][0], ranges["Clay"][1], ranges["Clay"][2],
+                        ranges["Silt"][0], ranges["Silt"][1], ranges["Silt"][2],
+                        ranges["Sand"][0], ranges["Sand"][1], ranges["Sand"][2],
+                        d, depth, ("Clay", "Silt", "Sand"), zone_num, zones, state, rng
+                    )
             data.append(row)
+        stats.count("rows", len(data))
         return data
 
+    def generate_columns(self, depth, zones, base_type, env_type, rng=None, step=2, stats=NO_STATS):
+        """Generates the data column by column, one NumPy array per parameter."""
+        rng = np.random.default_rng() if rng is None else rng
+        depth_values = depth_grid(np.arange(count_rows(depth, step)), step)
+        return self.generate_block(depth_values, depth, zones, base_type, env_type, TrendState(stats), rng)
+
+    def iter_profile(self, depth, base_type, env_type, chunk_rows=10000, zones=None, seed=None, output="columns", step=2):
+        """Yields a profile of any depth (cm) in chunks of chunk_rows rows, so memory does not grow with depth.
+
+        Each chunk is a {column: array} dict, or a list of row dicts with output="rows". The
+        trends continue across chunks. zones default to a fresh draw for the depth.
+        """
+        rng = np.random.default_rng(seed)
+        if zones is None:
+            zones = self.assign_depths_to_zones(depth, self.generate_unique_zone_percentages(rng), step)
+        state = TrendState()
+        n_rows = count_rows(depth, step)
+        for start in range(0, n_rows, chunk_rows):
+            depth_values = depth_grid(np.arange(start, min(start + chunk_rows, n_rows)), step)
+            columns = self.generate_block(depth_values, depth, zones, base_type, env_type, state, rng)
+            yield self.columns_to_rows(columns) if output == "rows" else columns
+
+    def generate_block(self, depth_values, depth, zones, base_type, env_type, state, rng):
+        """Generates the columns of a run of consecutive depths, continuing the trends held in state."""
+        zone_ids = self.assign_zone_ids(depth_values, zones)
+        stats = state.stats
+        stats.count("rows", len(depth_values))
+
+        columns = {"Depth": depth_values, "Zone": zone_ids}
+        for param in PARAMETERS:
+            columns[param] = np.zeros(len(depth_values))
+
+        for zone_num in np.unique(zone_ids[zone_ids > 0]).tolist():
+            rows = np.flatnonzero(zone_ids == zone_num)
+            d = depth_values[rows]
+            with stats.timer("ranges"):
+                ranges = self.get_parameter_ranges(base_type, env_type, zone_num)
+
+            with stats.timer("values"):
+                for param in VALUE_PARAMETERS:
+                    if param in ranges:
+                        min_val, max_val, trend = ranges[param]
+                        columns[param][rows] = self.generate_trend(d, depth, min_val, max_val, trend, param, zones[zone_num], state, rng)
+
+            for params in COMPOSITIONS:
+                if params[0] in ranges:
+                    bounds = [ranges[p] for p in params]
+                    with stats.timer("compositions"):
+                        parts, infeasible = self.generate_sum_to_100_array(d, depth, bounds, params, zones[zone_num], state, rng)
+                    for i, param in enumerate(params):
+                        columns[param][rows] = parts[:, i]
+                    stats.count("infeasible_rows", int(infeasible.sum()))
+                    if infeasible.any():
+                        warnings.warn(
+                            f"Zone {zone_num}: the {'/'.join(params)} ranges {[b[:2] for b in bounds]} cannot sum to 100; "
+                            f"{infeasible.sum()} of {len(rows)} rows were scaled from the nearest bounds."
+                        )
+
+        for param in PARAMETERS:
+            columns[param] = np.round(columns[param], 2)
+        return columns
+
+    def rows_to_columns(self, data):
+        """Converts a list of row dicts to {column: array}, with Zone as uint8 (0 where there is no zone)."""
+        columns = {key: np.array([row[key] for row in data], dtype=float if key in PARAMETERS else None)
+                   for key in (data[0] if data else ["Depth"] + PARAMETERS) if key != "Zone"}
+        columns["Zone"] = np.array([row["Zone"] or 0 for row in data], dtype=np.uint8)
+        return {key: columns[key] for key in ["Depth", "Zone"] + PARAMETERS}
+
+    def columns_to_rows(self, columns):
+        """Converts generate_columns output to the list of row dicts used by generate_data."""
+        keys = list(columns)
+        return [dict(zip(keys, values)) for values in zip(*(columns[key].tolist() for key in keys))]
+
+    def generate_trend(self, d, depth, min_val, max_val, trend, param, zone_bounds, state, rng):
+        """Generates values for a whole array of depths, following the trends of generate_value."""
+        n = len(d)
+        if n == 0:
+            return np.zeros(0)
+        i = state.index(param)
 
-    def generate_value(self, d, depth, min_val, max_val, trend, param, zone_num, zones, data):
-        """Generates a value based on the trend."""
+        if trend == "SP":  # Sporadic: 70% chance to be 0
+            values = rng.uniform(min_val, max_val, n)
+            values[rng.random(n) < 0.7] = 0
+            return values
+
+        elif trend == "UP":  # Up: each value is uniform between the last one and max_val * 0.7
+            last_val = min_val * 1.3 if state.up[i] is None else state.up[i]
+            ceiling = max_val * 0.7
+            values = ceiling - (ceiling - last_val) * np.cumprod(1 - rng.random(n))
+            state.up[i] = float(values[-1])
+            return values
+
+        elif trend == "DN":  # Down: each value is uniform between min_val * 1.3 and the last one
+            last_val = max_val * 0.7 if state.dn[i] is None else state.dn[i]
+            floor = min_val * 1.3
+            values = floor + (last_val - floor) * np.cumprod(rng.random(n))
+            state.dn[i] = float(values[-1])
+            return values
+
+        elif trend == "LF":  # LowFluctuation: random walk of the center
+            center = (min_val + max_val) / 2 if state.lf[i] is None else state.lf[i]
+            fluctuation = (max_val - min_val) * 0.4
+            values = center + np.cumsum(rng.uniform(-fluctuation, fluctuation, n))
+            state.lf[i] = float(values[-1])
+            return values
 
-        normalized_depth = d / depth if depth > 0 else 0
+        elif trend == "HF":  # HighFluctuation
+            fluctuation = (max_val - min_val) * 0.8
+            center = (min_val + max_val) / 2
+            return rng.uniform(center - fluctuation, center + fluctuation, n)
+
+        elif trend in ("SL", "SH"):  # StagnantLow / StagnantHigh: first stagnant, then decreasing / increasing
+            centers, lasts = (state.sl_center, state.sl_last) if trend == "SL" else (state.sh_center, state.sh_last)
+            midpoint = depth * rng.uniform(0.4, 0.6, n)
+            stagnant = d <= midpoint
+            if centers[i] is None:
+                centers[i] = float(rng.uniform(min_val * 1.2, max_val * 0.8))
+            center = centers[i]
+            fluctuation = (max_val - min_val) * 0.05
+
+            values = np.empty(n)
+            values[stagnant] = rng.uniform(max(min_val, center - fluctuation), min(max_val, center + fluctuation), stagnant.sum())
+
+            moving = ~stagnant
+            if moving.any():
+                last_val = center if lasts[i] is None else lasts[i]
+                remaining = np.maximum(depth - midpoint[moving], 0)
+                normalized_depth = np.divide(d[moving] - midpoint[moving], remaining, out=np.zeros(moving.sum()), where=remaining > 0)
+                steps = np.cumprod(1 - normalized_depth * 0.5)  # Slower decreasing / increasing
+                if trend == "SL":
+                    moved = min_val + (last_val - min_val) * steps
+                else:
+                    moved = max_val - (max_val - last_val) * steps
+                lasts[i] = float(moved[-1])
+                values[moving] = np.clip(moved, min_val, max_val)
+            return values
+
+        elif trend in ("UD", "DU"):  # UpDown / DownUp within the zone
+            start, end = zone_bounds
+            midpoint = start + (end - start) * rng.uniform(0.4, 0.6, n)
+            first_half = d <= midpoint
+            rising = np.divide(d - start, midpoint - start, out=np.zeros(n), where=midpoint - start > 0)
+            falling = np.divide(d - midpoint, end - midpoint, out=np.zeros(n), where=end - midpoint > 0)
+            if trend == "UD":
+                return np.where(first_half, min_val + (max_val - min_val) * rising, max_val - (max_val - min_val) * falling)
+            return np.where(first_half, max_val - (max_val - min_val) * rising, min_val + (max_val - min_val) * falling)
+
+        elif trend == "RM":  # Random
+            return rng.uniform(min_val, max_val, n)
+
+        raise ValueError(f"Unknown trend: {trend}")
+
+
+    def generate_value(self, d, depth, min_val, max_val, trend, param, zone_num, zones, data, state=None, rng=random):
+        """Generates a value based on the trend, keeping random-walk state in state (a TrendState)."""
+        state = TrendState() if state is None else state
+        i = state.index(param)
 
         if trend == "SP":  # Sporadic: 70% chance to be 0
-            if random.random() < 0.7:
+            if rng.random() < 0.7:
                 return round(0, 2)
             else:
-                return round(random.uniform(min_val, max_val), 2)
+                return round(rng.uniform(min_val, max_val), 2)
 
         elif trend == "UP":  # Up: Increasing values
-            if not hasattr(self, f'{param}_last_val_up'):
-                setattr(self, f'{param}_last_val_up', min_val * 1.3)  # Initialize
-            last_val_up = getattr(self, f'{param}_last_val_up')
-            new_val = random.uniform(last_val_up, max_val * 0.7)
-            setattr(self, f'{param}_last_val_up', new_val)
-            return round(new_val, 2)
+            if state.up[i] is None:
+                state.up[i] = min_val * 1.3  # Initialize
+            state.up[i] = rng.uniform(state.up[i], max_val * 0.7)
+            return round(state.up[i], 2)
 
         elif trend == "DN":  # Down: Decreasing values
-            if not hasattr(self, f'{param}_last_val_dn'):
-                setattr(self, f'{param}_last_val_dn', max_val * 0.7) # Initialize
-            last_val_dn = getattr(self, f'{param}_last_val_dn')
-            new_val = random.uniform(min_val * 1.3, last_val_dn)
-            setattr(self, f'{param}_last_val_dn', new_val)
-            return round(new_val, 2)
+            if state.dn[i] is None:
+                state.dn[i] = max_val * 0.7  # Initialize
+            state.dn[i] = rng.uniform(min_val * 1.3, state.dn[i])
+            return round(state.dn[i], 2)
 
         elif trend == "LF":  # LowFluctuation
-            if not hasattr(self, f'{param}_lf_center'):
-                setattr(self, f'{param}_lf_center', (min_val + max_val) / 2)   # or some other initial value
-            lf_center = getattr(self, f'{param}_lf_center')
+            if state.lf[i] is None:
+                state.lf[i] = (min_val + max_val) / 2
             fluctuation = (max_val - min_val) * 0.4  # 40% fluctuation
-            new_val = random.uniform(lf_center - fluctuation, lf_center + fluctuation)
-            setattr(self, f'{param}_lf_center', new_val)  # Update center for next call, creating slow drift
-            return round(new_val, 2)
+            state.lf[i] = rng.uniform(state.lf[i] - fluctuation, state.lf[i] + fluctuation)  # Slow drift of the center
+            return round(state.lf[i], 2)
 
         elif trend == "HF":  # HighFluctuation
             fluctuation = (max_val - min_val) * 0.8  # 80% fluctuation
             center = (min_val + max_val) / 2
-            return round(random.uniform(center - fluctuation, center + fluctuation), 2)
-            
-        elif trend == "SL": #StagnantLow: first stagnant, then decreasing
-            midpoint_ratio = random.uniform(0.4, 0.6)
-            midpoint = depth * midpoint_ratio
-            if d <= midpoint:
-                if not hasattr(self, f'{param}_stagnant_center_sl'):
-                    setattr(self, f'{param}_stagnant_center_sl', random.uniform(min_val * 1.2, max_val * 0.8))
-                stagnant_center_sl = getattr(self, f'{param}_stagnant_center_sl')
-                fluctuation = (max_val - min_val) * 0.05  # 5% fluctuation
-                return round(random.uniform(max(min_val, stagnant_center_sl - fluctuation), min(max_val, stagnant_center_sl + fluctuation)), 2)
-
-            else:
-                if not hasattr(self, f'{param}_last_val_sl'):
-                    setattr(self, f'{param}_last_val_sl', getattr(self, f'{param}_stagnant_center_sl'))#initialize with the stagnant value
-                last_val_sl = getattr(self, f'{param}_last_val_sl')
-                normalized_depth = (d - midpoint) / (depth - midpoint) if (depth - midpoint) > 0 else 0
-                new_val = round(float(last_val_sl - (last_val_sl-min_val) * normalized_depth * 0.5 ),2) #slower decreasing
-                setattr(self, f'{param}_last_val_sl', new_val)
-                return max(min_val, min(new_val, max_val)) #Limit the value
+            return round(rng.uniform(center - fluctuation, center + fluctuation), 2)
 
-        elif trend == "SH": #StagnantHigh: first stagnant, then increasing
-            midpoint_ratio = random.uniform(0.4, 0.6)
+        elif trend in ("SL", "SH"):  # StagnantLow / StagnantHigh: first stagnant, then decreasing / increasing
+            centers, lasts = (state.sl_center, state.sl_last) if trend == "SL" else (state.sh_center, state.sh_last)
+            midpoint_ratio = rng.uniform(0.4, 0.6)
             midpoint = depth * midpoint_ratio
+            if centers[i] is None:
+                centers[i] = rng.uniform(min_val * 1.2, max_val * 0.8)
             if d <= midpoint:
-                if not hasattr(self, f'{param}_stagnant_center_sh'):
-                    setattr(self, f'{param}_stagnant_center_sh', random.uniform(min_val * 1.2, max_val * 0.8))
-                stagnant_center_sh = getattr(self, f'{param}_stagnant_center_sh')
-                fluctuation = (max_val - min_val) * 0.05
-                return round(random.uniform(max(min_val, stagnant_center_sh - fluctuation), min(max_val, stagnant_center_sh + fluctuation)), 2)
+                fluctuation = (max_val - min_val) * 0.05  # 5% fluctuation
+                return round(rng.uniform(max(min_val, centers[i] - fluctuation), min(max_val, centers[i] + fluctuation)), 2)
             else:
-                if not hasattr(self, f'{param}_last_val_sh'):
-                    setattr(self, f'{param}_last_val_sh', getattr(self, f'{param}_stagnant_center_sh')) #initialize with the stagnant value
-                last_val_sh = getattr(self, f'{param}_last_val_sh')
+                if lasts[i] is None:
+                    lasts[i] = centers[i]  # Initialize with the stagnant value
                 normalized_depth = (d - midpoint) / (depth - midpoint) if (depth - midpoint) > 0 else 0
+                if trend == "SL":
+                    lasts[i] = round(float(lasts[i] - (lasts[i] - min_val) * normalized_depth * 0.5), 2)  # Slower decreasing
+                else:
+                    lasts[i] = round(float(lasts[i] + (max_val - lasts[i]) * normalized_depth * 0.5), 2)  # Slower increasing
+                return max(min_val, min(lasts[i], max_val))  # Limit the value
 
-                new_val = round(float(last_val_sh + (max_val - last_val_sh) * normalized_depth * 0.5),2) #Slower increasing
-                setattr(self, f'{param}_last_val_sh', new_val)
-                return max(min_val, min(new_val, max_val))  #Limit the value
-
-        elif trend == "UD":  # UpDown
-            midpoint_ratio = random.uniform(0.4, 0.6)
-            midpoint = zones[zone_num][0] + (zones[zone_num][1] - zones[zone_num][0]) * midpoint_ratio
-
-            if d <= midpoint:
-                # Increasing part
-                normalized_zone_depth = (d - zones[zone_num][0]) / (midpoint - zones[zone_num][0]) if (midpoint - zones[zone_num][0]) > 0 else 0
-                return round(float(min_val + (max_val - min_val) * normalized_zone_depth), 2)
-            else:
-                # Decreasing part
-                normalized_zone_depth = (d - midpoint) / (zones[zone_num][1] - midpoint) if (zones[zone_num][1] - midpoint) > 0 else 0
-                return round(float(max_val - (max_val - min_val) * normalized_zone_depth), 2)
-
-        elif trend == "DU":  # DownUp
-            midpoint_ratio = random.uniform(0.4, 0.6)
-            midpoint = zones[zone_num][0] + (zones[zone_num][1] - zones[zone_num][0]) * midpoint_ratio
+        elif trend in ("UD", "DU"):  # UpDown / DownUp within the zone
+            midpoint_ratio = rng.uniform(0.4, 0.6)
+            start, end = zones[zone_num]
+            midpoint = start + (end - start) * midpoint_ratio
 
             if d <= midpoint:
-                # Decreasing part
-                normalized_zone_depth = (d - zones[zone_num][0]) / (midpoint - zones[zone_num][0]) if (midpoint - zones[zone_num][0]) > 0 else 0
-                return round(float(max_val - (max_val - min_val) * normalized_zone_depth), 2)
+                normalized_zone_depth = (d - start) / (midpoint - start) if (midpoint - start) > 0 else 0
+                rising = trend == "UD"
             else:
-                # Increasing part
-                normalized_zone_depth = (d - midpoint) / (zones[zone_num][1] - midpoint) if (zones[zone_num][1] - midpoint) > 0 else 0
+                normalized_zone_depth = (d - midpoint) / (end - midpoint) if (end - midpoint) > 0 else 0
+                rising = trend == "DU"
+            if rising:
                 return round(float(min_val + (max_val - min_val) * normalized_zone_depth), 2)
-        
-        elif trend == "RM": # Random
-            return round(random.uniform(min_val, max_val), 2)
-
+            return round(float(max_val - (max_val - min_val) * normalized_zone_depth), 2)
 
-    def generate_profile(self, depth_choice, base_type, env_type):
-        """Generates the paleo profile based on user selections."""
-
-        depth_ranges = {1: (50, 100), 2: (100, 200), 3: (200, 300), 4: (300, 400), 5: (400, 500), 6: (500, 600)}
-        min_depth, max_depth = depth_ranges[depth_choice]
-        depth = random.randrange(min_depth, max_depth + 1, 2)
-
-        zone_percentages = self.generate_unique_zone_percentages()
-        zones = self.assign_depths_to_zones(depth, zone_percentages)
-        data = self.generate_data(depth, zones, base_type, env_type)
-        return data
+        elif trend == "RM": # Random
+            return round(rng.uniform(min_val, max_val), 2)
+
+
+    def generate_profile(self, depth_choice, base_type, env_type, engine="python", seed=None, depth=None, step=2, output="rows",
+                         stats=False):
+        """Generates the paleo profile based on user selections.
+
+        seed (an int or a numpy SeedSequence) makes the profile reproducible with either engine.
+        depth (cm) overrides the depth choice, and step sets the sampling interval (cm).
+        output is one of OUTPUTS: "columns" and "frame" skip the row dicts with the numpy
+        engine, and keep Zone as uint8 (and Depth as int for an integer step).
+        With stats=True, returns (profile, ProfileStats) with the stage timings and counters.
+        """
+        if output not in OUTPUTS:
+            raise ValueError(f"Unknown output: {output}")
+        profile_stats = ProfileStats() if stats else NO_STATS
+        profile_stats.count("profiles")
+        rng = np.random.default_rng(seed)
+        depth, zones = self.draw_depth_and_zones(depth_choice, rng, depth, step, profile_stats)
+        if engine == "numpy" and output != "rows":
+            profile = self.generate_columns(depth, zones, base_type, env_type, rng, step, profile_stats)
+        else:
+            profile = self.generate_data(depth, zones, base_type, env_type, engine, rng, step, profile_stats)
+            if output != "rows":
+                profile = self.rows_to_columns(profile)
+        if output == "frame":
+            profile = pd.DataFrame(profile)
+        return (profile, profile_stats) if stats else profile
+
+    def draw_depth_and_zones(self, depth_choice, rng, depth=None, step=2, stats=NO_STATS):
+        """Draws the total depth of a depth choice (unless depth is given) and splits it into zones."""
+        with stats.timer("zones"):
+            depth = self.draw_depth(depth_choice, rng, depth)
+            zone_percentages = self.generate_unique_zone_percentages(rng)
+            zones = self.assign_depths_to_zones(depth, zone_percentages, step)
+        stats.count("zone_draws")
+        return depth, zones
+
+    def draw_depths_and_zones(self, depth_choice, rngs, depth=None, step=2, stats=NO_STATS):
+        """Same draws as draw_depth_and_zones for each generator in rngs, with the zone percentages solved in one call."""
+        with stats.timer("zones"):
+            depths = [self.draw_depth(depth_choice, rng, depth) for rng in rngs]
+            uniforms = np.array([rng.random(len(ZONE_PERCENTAGE_BOUNDS) - 1) for rng in rngs]).reshape(
+                len(rngs), len(ZONE_PERCENTAGE_BOUNDS) - 1)
+            percentages = sample_zone_percentages(len(rngs), uniforms=uniforms)
+            drawn = [(d, self.assign_depths_to_zones(d, p, step)) for d, p in zip(depths, percentages.tolist())]
+        stats.count("zone_draws", len(rngs))
+        return drawn
+
+    def draw_depth(self, depth_choice, rng, depth=None):
+        """Draws the total depth (cm) of a depth choice, on the 2 cm grid; a given depth is returned as is."""
+        if depth is None:
+            depth_ranges = {1: (50, 100), 2: (100, 200), 3: (200, 300), 4: (300, 400), 5: (400, 500), 6: (500, 600)}
+            min_depth, max_depth = depth_ranges[depth_choice]
+            depth = min_depth + 2 * int(rng.integers(0, (max_depth - min_depth) // 2 + 1))
+        return depth
+
+    def generate_profiles(self, n, depth_choice, base_type, env_type, engine="numpy", seed=None, workers=1, chunk_size=None,
+                          depth=None, step=2, output="columns", stats=False):
+        """Generates n profiles ({profile id: columns} or a CompactEnsemble), the same for any workers and chunk_size."""
+        if output not in ("columns", "compact"):
+            raise ValueError(f"Unknown output: {output}")
+        root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        args = (depth_choice, base_type, env_type, engine, root, depth, step, output, stats)
+        if workers <= 1:
+            return generate_profile_chunk(self, range(n), *args)
+
+        chunk_size = chunk_size or max(1, -(-n // (workers * 4)))  # About four tasks per worker
+        chunks = [range(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+        profiles = CompactEnsemble() if output == "compact" else {}
+        batch_stats = ProfileStats()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk in executor.map(generate_profile_chunk, [self] * len(chunks), chunks, *[[arg] * len(chunks) for arg in args]):
+                if stats:
+                    chunk, chunk_stats = chunk
+                    batch_stats.merge(chunk_stats)
+                if output == "compact":
+                    profiles.merge(chunk)
+                else:
+                    profiles.update(chunk)
+        return (profiles, batch_stats) if stats else profiles
 
-    def generate_sum_to_100(self, min1, max1, trend1, min2, max2, trend2, min3, max3, trend3, d, depth):
+    def generate_sum_to_100(self, min1, max1, trend1, min2, max2, trend2, min3, max3, trend3, d, depth,
+                            params=("", "", ""), zone_num=0, zones=None, state=None, rng=random):
         """Generates three values that sum to 100, respecting bounds and trends."""
+        state = TrendState() if state is None else state
+        state.stats.count("sum_to_100_calls")
         max_attempts = 100
         for _ in range(max_attempts):
-            v1 = self.generate_value(d, depth, min1, max1, trend1, "", 0, {}, [])
-            v2 = self.generate_value(d, depth, min2, max2, trend2, "", 0, {}, [])
-            v3 = self.generate_value(d, depth, min3, max3, trend3, "", 0, {}, [])
+            state.stats.count("sum_to_100_attempts")
+            v1 = self.generate_value(d, depth, min1, max1, trend1, params[0], zone_num, zones, [], state, rng)
+            v2 = self.generate_value(d, depth, min2, max2, trend2, params[1], zone_num, zones, [], state, rng)
+            v3 = self.generate_value(d, depth, min3, max3, trend3, params[2], zone_num, zones, [], state, rng)
 
             if v1 + v2 + v3 == 0:
                 return 0.00, 0.00, 0.00
@@ -225,6 +568,11 @@ class ProfileGenerator:
             if min1 <= p1 <= max1 and min2 <= p2 <= max2 and min3 <= p3 <= max3:
                 return p1, p2, p3
 
+        state.stats.count("sum_to_100_fallbacks")
+        return self.fallback_sum_to_100(min1, max1, min2, max2, min3, max3)
+
+    def fallback_sum_to_100(self, min1, max1, min2, max2, min3, max3):
+        """Fixed split used by generate_sum_to_100 when no attempt respected the bounds."""
         v1 = round(max(min1, min(max1, 33.33)), 2)
         v2 = round(max(min2, min(max2, 33.33)), 2)
         v3 = round(100 - v1 - v2, 2)
@@ -239,353 +587,35 @@ class ProfileGenerator:
 
         return round(v1, 2), round(v2, 2), round(100 - v1 - v2, 2)
 
+    def generate_sum_to_100_array(self, d, depth, bounds, params, zone_bounds, state, rng):
+        """Array version of generate_sum_to_100, using one trend draw per part and samplers.sample_compositions.
+
+        Returns the (len(d), 3) compositions and the mask of rows whose bounds could not sum to 100.
+        """
+        values = np.column_stack([
+            self.generate_trend(d, depth, min_val, max_val, trend, param, zone_bounds, state, rng)
+            for (min_val, max_val, trend), param in zip(bounds, params)
+        ])
+        lows = [min_val for min_val, _, _ in bounds]
+        highs = [max_val for _, max_val, _ in bounds]
+        parts, infeasible = sample_compositions(values, lows, highs)
+
+        # Round like generate_sum_to_100: the last part takes the rounding remainder
+        parts[:, :2] = np.round(parts[:, :2], 2)
+        parts[:, 2] = np.round(100 - parts[:, 0] - parts[:, 1], 2)
+        return parts, infeasible
+
 
     def get_parameter_ranges(self, base_type, env_type, zone_num):
         """Gets parameter ranges, considering custom overrides."""
+        return self.range_table.lookup(zone_num, base_type, env_type)
+
+    def generate_diagram(self, data, show_zones=False, stats=NO_STATS):
+        """Generates the Matplotlib diagram in self.renderer's figure, optionally marking the zone boundaries."""
+        with self._diagram_lock, stats.timer("diagram"):
+            return self.renderer.render(data, show_zones)
 
-        # Check for custom ranges first
-        if (zone_num, base_type, env_type) in self.custom_ranges:
-            return self.custom_ranges[(zone_num, base_type, env_type)]
-
-        ranges = {}  # Initialize ranges
-
-        if zone_num == 5:  # Base type only applies to zone 5
-            if base_type == "Rock":
-                ranges = {
-                    "OM": (0, 0, "LF"),
-                    "IM": (70, 95, "LF"),
-                    "CC": (12, 30, "LF"),
-                    "Clay": (0, 5, "LF"),
-                    "Silt": (5, 15, "HF"),
-                    "Sand": (70, 90, "HF"),
-                    "MS": (130, 220, "HF"),
-                    "CH": (0, 0, "SP"),
-                    "AP": (0, 0, "LF"),
-                    "NAP": (0, 0, "LF"),
-                    "WL": (0, 0, "LF"),
-                    "CR": (0, 0, "LF"),
-                    "Ca": (270, 400, "HF"),
-                    "Mg": (250, 330, "HF"),
-                    "Na": (300, 400, "HF"),
-                    "K": (300, 400, "HF")
-                }
-            elif base_type == "Sand":
-                ranges = {
-                    "OM": (0, 0, "LF"),
-                    "IM": (70, 95, "LF"),
-                    "CC": (5, 20, "LF"),
-                    "Clay": (0, 5, "UP"),
-                    "Silt": (0, 10, "UP"),
-                    "Sand": (85, 95, "UP"),
-                    "MS": (150, 200, "LF"),
-                    "CH": (0, 0, "SP"),
-                    "AP": (20, 60, "LF"),
-                    "NAP": (0, 20, "LF"),
-                    "WL": (0, 0, "LF"),
-                    "CR": (30, 90, "LF"),
-                    "Ca": (70, 100, "LF"),
-                    "Mg": (50, 90, "LF"),
-                    "Na": (100, 150, "LF"),
-                    "K": (100, 140, "LF")
-                }
-            elif base_type == "Paleosol":
-                ranges = {
-                    "OM": (0, 30, "LF"),
-                    "IM": (30, 80, "LF"),
-                    "CC": (0, 30, "LF"),
-                    "Clay": (0, 30, "LF"),
-                    "Silt": (0, 30, "LF"),
-                    "Sand": (0, 90, "LF"),
-                    "MS": (100, 150, "LF"),
-                    "CH": (0, 10, "SP"),
-                    "AP": (130, 280, "LF"),
-                    "NAP": (10, 90, "LF"),
-                    "WL": (40, 100, "LF"),
-                    "CR": (60, 90, "LF"),
-                    "Ca": (100, 200, "HF"),
-                    "Mg": (100, 130, "HF"),
-                    "Na": (100, 200, "LF"),
-                    "K": (100, 200, "LF")
-                }
-            elif base_type == "Lake sediment":
-                ranges = {
-                    "OM": (5, 20, "LF"),
-                    "IM": (40, 90, "LF"),
-                    "CC": (5, 30, "LF"),
-                    "Clay": (10, 20, "LF"),
-                    "Silt": (10, 60, "LF"),
-                    "Sand": (20, 40, "LF"),
-                    "MS": (100, 150, "LF"),
-                    "CH": (0, 10, "SP"),
-                    "AP": (120, 260, "LF"),
-                    "NAP": (20, 90, "LF"),
-                    "WL": (10, 30, "UP"),
-                    "CR": (130, 290, "LF"),
-                    "Ca": (130, 200, "HF"),
-                    "Mg": (90, 130, "HF"),
-                    "Na": (200, 300, "LF"),
-                    "K": (200, 300, "LF")
-                }
-        # Zones 1-4, influenced by env_type
-        elif zone_num == 4:
-            if env_type == "Lake":
-                ranges.update({
-                    "OM": (5, 20, "LF"),
-                    "IM": (40, 80, "LF"),
-                    "CC": (5, 35, "LF"),
-                    "Clay": (10, 20, "LF"),
-                    "Silt": (10, 60, "LF"),
-                    "Sand": (20, 40, "LF"),
-                    "MS": (100, 150, "LF"),
-                    "CH": (0, 0, "SP"),
-                    "AP": (100, 160, "LF"),
-                    "NAP": (20, 40, "HF"),
-                    "WL": (20, 50, "HF"),
-                    "CR": (115, 250, "LF"),
-                    "Ca": (150, 190, "HF"),
-                    "Mg": (110, 140, "HF"),
-                    "Na": (220, 310, "HF"),
-                    "K": (210, 330, "LF")
-                })
-            elif env_type == "Peatland":
-                ranges.update({
-                    "OM": (30, 60, "UP"),
-                    "IM": (40, 80, "UP"),
-                    "CC": (5, 10, "UP"),
-                    "Clay": (10, 20, "UP"),
-                    "Silt": (10, 60, "UP"),
-                    "Sand": (20, 40, "UP"),
-                    "MS": (100, 150, "LF"),
-                    "CH": (0, 8, "SP"),
-                    "AP": (45, 199, "LF"),
-                    "NAP": (40, 80, "HF"),
-                    "WL": (40, 140, "HF"),
-                    "CR": (30, 90, "LF"),
-                    "Ca": (130, 200, "LF"),
-                    "Mg": (90, 130, "LF"),
-                    "Na": (200, 300, "LF"),
-                    "K": (200, 300, "LF")
-                })
-            elif env_type == "Wetland":
-                ranges.update({
-                    "OM": (5, 30, "LF"),
-                    "IM": (40, 90, "LF"),
-                    "CC": (5, 30, "LF"),
-                    "Clay": (10, 20, "LF"),
-                    "Silt": (10, 60, "LF"),
-                    "Sand": (20, 40, "LF"),
-                    "MS": (100, 150, "LF"),
-                    "CH": (0, 0, "SP"),
-                    "AP": (45, 199, "LF"),
-                    "NAP": (40, 80, "HF"),
-                    "WL": (140, 240, "HF"),
-                    "CR": (50, 120, "LF"),
-                    "Ca": (130, 200, "HF"),
-                    "Mg": (90, 130, "HF"),
-                    "Na": (200, 300, "HF"),
-                    "K": (200, 300, "HF")
-                })
-
-        elif zone_num == 3:
-            if env_type == "Lake":
-                ranges.update({
-                    "OM": (9, 18, "LF"),
-                    "IM": (40, 90, "LF"),
-                    "CC": (5, 30, "LF"),
-                    "Clay": (5, 40, "LF"),
-                    "Silt": (5, 60, "LF"),
-                    "Sand": (5, 60, "LF"),
-                    "MS": (100, 150, "HF"),
-                    "CH": (0, 5, "SP"),
-                    "AP": (45, 199, "LF"),
-                    "NAP": (40, 80, "HF"),
-                    "WL": (40, 140, "HF"),
-                    "CR": (30, 90, "LF"),
-                    "Ca": (130, 200, "HF"),
-                    "Mg": (90, 130, "LF"),
-                    "Na": (200, 300, "HF"),
-                    "K": (200, 300, "HF")
-                })
-            elif env_type == "Peatland":
-              ranges.update({
-                "OM": (30, 60, "UP"),
-                "IM": (20, 60, "UP"),
-                "CC": (5, 30, "UP"),
-                "Clay": (5, 40, "UP"),
-                "Silt": (5, 60, "UP"),
-                "Sand": (5, 40, "UP"),
-                "MS": (50, 100, "LF"),
-                "CH": (0, 5, "SP"),
-                "AP": (45, 199, "LF"),
-                "NAP": (40, 80, "HF"),
-                "WL": (220, 340, "HF"),
-                "CR": (0, 30, "SP"),
-                "Ca": (130, 200, "LF"),
-                "Mg": (90, 130, "LF"),
-                "Na": (200, 300, "LF"),
-                "K": (200, 300, "LF")
-            })
-            elif env_type == "Wetland":
-                ranges.update({
-                    "OM": (10, 30, "LF"),
-                    "IM": (30, 70, "LF"),
-                    "CC": (20, 40, "LF"),
-                    "Clay": (10, 40, "LF"),
-                    "Silt": (20, 60, "LF"),
-                    "Sand": (10, 50, "LF"),
-                    "MS": (40, 70, "LF"),
-                    "CH": (0, 5, "SP"),
-                    "AP": (45, 199, "LF"),
-                    "NAP": (40, 80, "HF"),
-                    "WL": (220, 340, "HF"),
-                    "CR": (0, 30, "SP"),
-                    "Ca": (830, 1400, "LF"),
-                    "Mg": (390, 530, "LF"),
-                    "Na": (200, 300, "LF"),
-                    "K": (200, 300, "LF")
-                })
-
-        elif zone_num == 2:
-            if env_type == "Lake":
-                ranges.update({
-                    "OM": (10, 30, "LF"),
-                    "IM": (40, 80, "HF"),
-                    "CC": (5, 40, "HF"),
-                    "Clay": (5, 40, "HF"),
-                    "Silt": (5, 60, "HF"),
-                    "Sand": (5, 60, "LF"),
-                    "MS": (50, 80, "LF"),
-                    "CH": (0, 0, "SP"),
-                    "AP": (45, 199, "LF"),
-                    "NAP": (40, 80, "HF"),
-                    "WL": (220, 340, "HF"),
-                    "CR": (0, 10, "SP"),
-                    "Ca": (630, 1200, "LF"),
-                    "Mg": (190, 230, "LF"),
-                    "Na": (200, 300, "LF"),
-                    "K": (200, 300, "LF")
-                })
-            elif env_type == "Peatland":
-              ranges.update({
-                "OM": (80, 99, "RM"),
-                "IM": (1, 10, "HF"),
-                "CC": (1, 5, "HF"),
-                "Clay": (20, 60, "UP"),
-                "Silt": (20, 60, "UP"),
-                "Sand": (1, 5, "UP"),
-                "MS": (20, 40, "LF"),
-                "CH": (0, 0, "SP"),
-                "AP": (45, 80, "LF"),
-                "NAP": (140, 180, "HF"),
-                "WL": (220, 340, "HF"),
-                "CR": (0, 10, "SP"),
-                "Ca": (630, 1200, "LF"),
-                "Mg": (190, 230, "LF"),
-                "Na": (500, 600, "LF"),
-                "K": (500, 600, "LF")
-            })
-            elif env_type == "Wetland":
-                ranges.update({
-                    "OM": (50, 90, "LF"),
-                    "IM": (5, 30, "HF"),
-                    "CC": (5, 15, "HF"),
-                    "Clay": (20, 60, "LF"),
-                    "Silt": (20, 60, "LF"),
-                    "Sand": (1, 5, "LF"),
-                    "MS": (120, 140, "HF"),
-                    "CH": (0, 10, "SP"),
-                    "AP": (45, 80, "LF"),
-                    "NAP": (140, 180, "HF"),
-                    "WL": (220, 340, "HF"),
-                    "CR": (0, 10, "SP"),
-                    "Ca": (130, 200, "LF"),
-                    "Mg": (90, 130, "LF"),
-                    "Na": (500, 600, "LF"),
-                    "K": (500, 600, "LF")
-                })
-
-        elif zone_num == 1:
-            if env_type == "Lake":
-                ranges.update({
-                    "OM": (5, 15, "RM"),
-                    "IM": (40, 80, "RM"),
-                    "CC": (5, 30, "RM"),
-                    "Clay": (5, 40, "LF"),
-                    "Silt": (10, 60, "LF"),
-                    "Sand": (20, 60, "LF"),
-                    "MS": (150, 300, "HF"),
-                    "CH": (0, 15, "SP"),
-                    "AP": (145, 180, "LF"),
-                    "NAP": (340, 480, "HF"),
-                    "WL": (220, 340, "HF"),
-                    "CR": (0, 30, "SP"),
-                    "Ca": (190, 240, "LF"),
-                    "Mg": (90, 130, "LF"),
-                    "Na": (400, 600, "LF"),
-                    "K": (400, 500, "LF")
-                })
-            elif env_type == "Peatland":
-              ranges.update({
-                "OM": (25, 70, "HF"),
-                "IM": (40, 80, "RM"),
-                "CC": (5, 20, "RM"),
-                "Clay": (5, 40, "LF"),
-                "Silt": (10, 60, "LF"),
-                "Sand": (20, 60, "LF"),
-                "MS": (150, 300, "HF"),
-                "CH": (0, 15, "SP"),
-                "AP": (145, 180, "LF"),
-                "NAP": (340, 480, "HF"),
-                "WL": (220, 340, "HF"),
-                "CR": (0, 30, "SP"),
-                "Ca": (190, 240, "LF"),
-                "Mg": (90, 130, "LF"),
-                "Na": (600, 900, "LF"),
-                "K": (600, 900, "LF")
-            })
-            elif env_type == "Wetland":
-                ranges.update({
-                    "OM": (30, 70, "HF"),
-                    "IM": (10, 80, "HF"),
-                    "CC": (5, 30, "HF"),
-                    "Clay": (5, 20, "LF"),
-                    "Silt": (30, 60, "LF"),
-                    "Sand": (40, 70, "LF"),
-                    "MS": (400, 700, "LF"),
-                    "CH": (0, 15, "SP"),
-                    "AP": (145, 280, "LF"),
-                    "NAP": (340, 480, "LF"),
-                    "WL": (220, 340, "LF"),
-                    "CR": (0, 30, "SP"),
-                    "Ca": (130, 250, "LF"),
-                    "Mg": (90, 230, "LF"),
-                    "Na": (800, 900, "LF"),
-                    "K": (800, 900, "LF")
-                })
-
-        return ranges
-
-    def generate_diagram(self, data):
-        """Generates the Matplotlib diagram."""
-        if not data:
-            return None
-
-        df = pd.DataFrame(data)
-        df = df.set_index('Depth')
-        df = df.drop('Zone', axis=1)
-
-        fig, axes = plt.subplots(nrows=1, ncols=len(df.columns), figsize=(10, 6), sharey=True)
-
-        if len(df.columns) == 1:
-            axes = [axes]  # Ensure axes is always a list
-
-        for ax, col in zip(axes, df.columns):
-            ax.step(df[col], df.index, where='post')
-            ax.set_title(col, fontsize=9, rotation=0, ha='center')
-            ax.invert_yaxis()
-            ax.tick_params(axis='both', which='major', labelsize=6)
-            ax.tick_params(axis='both', which='minor', labelsize=4)
-            ax.set_ylim(df.index.max(), 0)
-
-        fig.subplots_adjust(wspace=0.1)
-        return fig  # Correctly return the figure object
\ No newline at end of file
+    def preview_diagram(self, data, show_zones=False, stats=NO_STATS):
+        """Generates a fast, low-DPI PNG of the diagram for on-screen display (None without data)."""
+        with self._diagram_lock, stats.timer("diagram"):
+            return self.preview_renderer.preview(data, show_zones)
@@ -0,0 +1,75 @@
+# profile_stats.py
+import time
+from contextlib import contextmanager, nullcontext
+
+STAGES = ["zones", "ranges", "values", "compositions", "diagram"]
+COUNTERS = [
+    "profiles", "rows",
+    "zone_draws",  # Zone percentage draws (the exact sampler needs one per profile)
+    "sum_to_100_calls", "sum_to_100_attempts", "sum_to_100_fallbacks",  # Python engine compositions
+    "infeasible_rows",  # NumPy engine rows whose composition ranges cannot sum to 100
+]
+
+
+class ProfileStats:
+    """Wall time (s) per generation stage and event counters, for one profile or summed over a batch."""
+
+    def __init__(self):
+        self.timings = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    @contextmanager
+    def timer(self, stage):
+        """Adds the time spent in the with block to the stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
+
+    def count(self, counter, n=1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def merge(self, other):
+        """Adds the timings and counters of other to these stats, and returns them."""
+        for stage, seconds in other.timings.items():
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        for counter, n in other.counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + n
+        return self
+
+    def __add__(self, other):
+        return ProfileStats().merge(self).merge(other)
+
+    @classmethod
+    def total(cls, stats):
+        """Sums the stats of a batch of profiles."""
+        result = cls()
+        for item in stats:
+            result.merge(item)
+        return result
+
+    def as_dict(self):
+        return {"timings": dict(self.timings), "counters": dict(self.counters)}
+
+    def report(self):
+        """Returns the timings (ms) and counters as printable lines."""
+        lines = [f"{stage:22s} {seconds * 1000:10.3f} ms" for stage, seconds in self.timings.items()]
+        lines += [f"{counter:22s} {n:10d}" for counter, n in self.counters.items()]
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"ProfileStats({self.as_dict()})"
+
+
+class NullStats(ProfileStats):
+    """Stats that record nothing, used when instrumentation is off."""
+
+    def timer(self, stage):
+        return nullcontext()
+
+    def count(self, counter, n=1):
+        pass
+
+
+NO_STATS = NullStats()
@@ -0,0 +1,118 @@
+# samplers.py
+import functools
+import itertools
+import math
+import numpy as np
+
+# (min, max) percentage of the total depth for zones 1-5
+ZONE_PERCENTAGE_BOUNDS = [(10, 20), (25, 60), (30, 60), (20, 40), (5, 10)]
+
+
+class UniformSumCDF:
+    """CDF of the sum of independent uniform variables, one per (low, high) bound."""
+
+    def __init__(self, bounds):
+        widths = [high - low for low, high in bounds]
+        if any(width <= 0 for width in widths):
+            raise ValueError("Every bound needs high > low.")
+        self.order = len(widths)
+        # Inclusion-exclusion over the corners of the box: one shifted power term per subset
+        subsets = list(itertools.product((0, 1), repeat=self.order))
+        lows = sum(low for low, _ in bounds)
+        self.shifts = np.array([lows + sum(w for w, used in zip(widths, s) if used) for s in subsets], dtype=float)
+        self.signs = np.array([(-1) ** sum(s) for s in subsets], dtype=float)
+        self.scale = math.factorial(self.order) * math.prod(widths)
+
+    def __call__(self, s):
+        if self.order == 0:
+            return (s >= 0).astype(float)
+        terms = np.clip(np.asarray(s, dtype=float)[..., None] - self.shifts, 0, None) ** self.order
+        return (terms * self.signs).sum(axis=-1) / self.scale
+
+
+@functools.lru_cache(maxsize=None)
+def rest_cdfs(bounds):
+    """UniformSumCDF of bounds[i + 1:] for every i but the last, built once per tuple of bounds."""
+    return [UniformSumCDF(bounds[i + 1:]) for i in range(len(bounds) - 1)]
+
+
+def sample_zone_percentages(n=None, rng=None, bounds=ZONE_PERCENTAGE_BOUNDS, total=100, iterations=32, uniforms=None):
+    """Draws zone percentages uniformly from the box bounds, conditioned on summing to total.
+
+    Each percentage is drawn in turn from its exact conditional distribution given the ones
+    already drawn (inverse CDF, solved by bisection), and the last one takes what remains,
+    so there is no retry loop. Returns an array of shape (len(bounds),), or (n, len(bounds))
+    when n is given.
+
+    uniforms, of shape (n, len(bounds) - 1), replaces the draws from rng: row j holds the
+    uniform variates of sample j, in the order a single draw takes them from its rng. This
+    lets a batch solve samples whose variates come from separate streams in one call.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    size = 1 if n is None else n
+    remaining = np.full(size, float(total))
+    samples = np.empty((size, len(bounds)))
+
+    if not sum(low for low, _ in bounds) <= total <= sum(high for _, high in bounds):
+        raise ValueError(f"Bounds cannot sum to {total}.")
+
+    cdfs = rest_cdfs(tuple(map(tuple, bounds)))
+    for i, (low, high) in enumerate(bounds[:-1]):
+        rest = bounds[i + 1:]
+        rest_cdf = cdfs[i]
+        lower = np.maximum(low, remaining - sum(b[1] for b in rest))
+        upper = np.minimum(high, remaining - sum(b[0] for b in rest))
+
+        # P(x <= v | remaining) is proportional to rest_cdf(remaining - lower) - rest_cdf(remaining - v)
+        top = rest_cdf(remaining - lower)
+        target = (rng.random(size) if uniforms is None else uniforms[:, i]) * (top - rest_cdf(remaining - upper))
+        a, b = lower.copy(), upper.copy()
+        for _ in range(iterations):
+            mid = (a + b) / 2
+            below = top - rest_cdf(remaining - mid) < target
+            a = np.where(below, mid, a)
+            b = np.where(below, b, mid)
+
+        samples[:, i] = (a + b) / 2
+        remaining = remaining - samples[:, i]
+
+    samples[:, -1] = np.clip(remaining, *bounds[-1])
+    return samples[0] if n is None else samples
+
+
+def sample_compositions(values, lows, highs, total=100):
+    """Turns trend values of shape (n, k) into compositions that sum to total within the bounds.
+
+    The values are normalised to percentages and then moved onto the bounded simplex by
+    adding the same shift to every part (clipped to its bounds), which is the closest
+    composition to the normalised one and keeps the trend shape of each part. Rows whose
+    values are all 0 start from an equal split. lows and highs broadcast against values.
+
+    Returns (compositions, infeasible), where infeasible flags the rows whose bounds cannot
+    sum to total; those rows are scaled proportionally from the nearest bound instead.
+    """
+    values = np.clip(np.asarray(values, dtype=float), 0, None)
+    lows = np.broadcast_to(np.asarray(lows, dtype=float), values.shape)
+    highs = np.broadcast_to(np.asarray(highs, dtype=float), values.shape)
+    n, k = values.shape
+
+    sums = values.sum(axis=1, keepdims=True)
+    shares = np.divide(values * total, sums, out=np.full(values.shape, total / k), where=sums > 0)
+
+    # Sum of the clipped parts is piecewise linear in the shift, with kinks where a part hits a bound
+    breakpoints = np.sort(np.concatenate([lows - shares, highs - shares], axis=1), axis=1)
+    clipped_sums = np.clip(shares[:, None, :] + breakpoints[:, :, None], lows[:, None, :], highs[:, None, :]).sum(axis=2)
+    after = np.clip((clipped_sums < total).sum(axis=1), 1, 2 * k - 1)[:, None]
+    b0, b1 = np.take_along_axis(breakpoints, after - 1, 1), np.take_along_axis(breakpoints, after, 1)
+    f0, f1 = np.take_along_axis(clipped_sums, after - 1, 1), np.take_along_axis(clipped_sums, after, 1)
+    shift = b0 + np.divide((total - f0) * (b1 - b0), f1 - f0, out=np.zeros((n, 1)), where=f1 > f0)
+    compositions = np.clip(shares + shift, lows, highs)
+
+    low_sums, high_sums = lows.sum(axis=1), highs.sum(axis=1)
+    too_low, too_high = high_sums < total, low_sums > total
+    nearest = np.where(too_low[:, None], highs, lows)
+    nearest_sums = np.where(too_low, high_sums, low_sums)[:, None]
+    scaled = np.divide(nearest * total, nearest_sums, out=np.full(values.shape, total / k), where=nearest_sums > 0)
+    infeasible = too_low | too_high
+    compositions[infeasible] = scaled[infeasible]
+    return compositions, infeasible
@@ -0,0 +1,126 @@
+# virtual_table.py
+import tkinter as tk
+from tkinter import ttk
+import numpy as np
+import pandas as pd
+
+
+class VirtualTable(tk.Frame):
+    """Scrollable table that only draws the rows in view.
+
+    The canvas holds one pool of text items per visible row, however long the profile is;
+    scrolling and resizing just rewrite the texts of that pool from the column arrays. So
+    showing, scrolling or replacing a profile takes the same time and memory at any length.
+    """
+
+    def __init__(self, master, row_height=20, column_width=64, font=("Helvetica", 9),
+                 header_font=("Helvetica", 9, "bold"), empty_text="No data to display.", **kwargs):
+        super().__init__(master, **kwargs)
+        self.empty_text = empty_text
+        self.row_height = row_height
+        self.column_width = column_width
+        self.font = font
+        self.header_font = header_font
+        self.columns = {}
+        self.headers = []
+        self.n_rows = 0
+        self.first = 0  # Data row shown at the top
+        self.pool = []  # [row items] per visible row; row items: (line, [text per column])
+
+        self.h_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.xview)
+        self.h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.v_scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.header = tk.Canvas(self, height=row_height, highlightthickness=0, xscrollcommand=self.h_scrollbar.set)
+        self.header.pack(side=tk.TOP, fill=tk.X)
+        self.body = tk.Canvas(self, highlightthickness=0, bg="white", xscrollcommand=self.h_scrollbar.set)
+        self.body.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.body.bind("<Configure>", lambda event: self.redraw())
+        for widget in (self.body, self.header):
+            widget.bind("<MouseWheel>", self.on_mousewheel)
+            widget.bind("<Button-4>", lambda event: self.scroll_rows(-3))  # Linux wheel up
+            widget.bind("<Button-5>", lambda event: self.scroll_rows(3))
+
+    def set_data(self, data):
+        """Shows a profile: a DataFrame, {column: array} or a list of row dicts (empty shows empty_text)."""
+        if isinstance(data, list):
+            data = pd.DataFrame(data)
+        self.columns = {name: np.asarray(values) for name, values in data.items()}
+        self.headers = list(self.columns)
+        self.n_rows = len(next(iter(self.columns.values()))) if self.columns else 0
+        self.first = 0
+
+        width = self.column_width * len(self.headers)
+        self.header.delete("all")
+        for j, name in enumerate(self.headers):
+            x = j * self.column_width
+            self.header.create_rectangle(x, 0, x + self.column_width, self.row_height - 1, outline="black")
+            self.header.create_text(x + self.column_width / 2, self.row_height / 2, text=name, font=self.header_font)
+        self.header.configure(scrollregion=(0, 0, width, self.row_height))
+        self.clear_pool()
+        self.redraw()
+
+    def clear_pool(self):
+        self.body.delete("all")
+        self.pool = []
+
+    def redraw(self):
+        """Fits the row pool to the visible height and fills it from the first visible row."""
+        if not self.n_rows:
+            self.clear_pool()
+            self.body.create_text(4, 4, text=self.empty_text, anchor="nw", font=self.font)
+            self.v_scrollbar.set(0, 1)
+            return
+
+        visible = max(1, self.body.winfo_height() // self.row_height + 1)
+        width = self.column_width * len(self.headers)
+        if len(self.pool) != visible:
+            self.clear_pool()
+            for r in range(visible):
+                y = r * self.row_height
+                line = self.body.create_line(0, y + self.row_height, width, y + self.row_height, fill="grey")
+                texts = [self.body.create_text((j + 0.5) * self.column_width, y + self.row_height / 2, font=self.font)
+                         for j in range(len(self.headers))]
+                self.pool.append((line, texts))
+            for j in range(1, len(self.headers) + 1):
+                self.body.create_line(j * self.column_width, 0, j * self.column_width, visible * self.row_height, fill="grey")
+            self.body.configure(scrollregion=(0, 0, width, visible * self.row_height))
+
+        self.first = max(0, min(self.first, self.n_rows - visible + 1))
+        for r, (line, texts) in enumerate(self.pool):
+            i = self.first + r
+            for name, text in zip(self.headers, texts):
+                self.body.itemconfigure(text, text=self.format(self.columns[name][i]) if i < self.n_rows else "")
+            self.body.itemconfigure(line, state="normal" if i < self.n_rows else "hidden")
+
+        self.v_scrollbar.set(self.first / self.n_rows, min(1.0, (self.first + visible - 1) / self.n_rows))
+
+    @staticmethod
+    def format(value):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return ""
+        return str(value.item() if isinstance(value, np.generic) else value)
+
+    def scroll_rows(self, n):
+        self.first = max(0, self.first + n)
+        self.redraw()
+
+    def yview(self, *args):
+        """Vertical scrollbar command: moves the first visible row instead of the canvas."""
+        visible = len(self.pool)
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * self.n_rows)
+        elif args[0] == "scroll":
+            step = visible - 1 if args[2] == "pages" else 1
+            self.first += int(args[1]) * step
+        self.first = max(0, self.first)
+        self.redraw()
+
+    def xview(self, *args):
+        """Horizontal scrollbar command: scrolls the header and the body together."""
+        self.header.xview(*args)
+        self.body.xview(*args)
+
+    def on_mousewheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)